@@ -1,36 +1,74 @@
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, START, END
-# Removed unused get_stream_writer import
-from typing import Annotated, Dict, List, Any
+from langgraph.types import StreamWriter
+from langgraph.config import get_stream_writer, get_config
+from langchain_core.runnables import RunnableConfig
+from typing import Dict, List, Any
 from typing_extensions import TypedDict
 # Removed unused interrupt import
 from pydantic import ValidationError
 from dataclasses import dataclass
-import logfire
+import threading
 import asyncio
+import json
+import uuid
 import sys
 import os
 import time
+import re
 
 # Import the message classes from Pydantic AI
-from pydantic_ai.messages import (
-    ModelMessage,
-    ModelMessagesTypeAdapter
-)
+from pydantic_ai.messages import ModelMessage, ModelResponse, ToolCallPart
+import pydantic_core
 
 # Import agent modules (but not the agents themselves yet)
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from agents.info_gathering_agent import TravelDetails
-from agents.flight_agent import FlightDeps
-from agents.hotel_agent import HotelDeps
+from agents.flight_agent import FlightDeps, FlightRecommendations, find_flights, pair_round_trips, recommend_round_trips
+from agents.hotel_agent import HotelDeps, HotelRecommendations, find_hotels, recommend_hotels, within_budget
+from agents.activity_agent import ActivityDeps, ActivityRecommendations, describe_weather, summarize_weather
+from http_sessions import start_http_sessions, close_http_sessions
+from checkpointer import SqliteCheckpointSaver
+from message_history import message_history_store
+from speculative_prefetch import speculative_prefetcher
+from deadlines import with_budget, deadline_config
+from utils import search_flights_api, resolve_hotel_destination, search_hotels_page, format_hotel_dates, get_weather_data, warm_llm_connection
+from metrics import instrument_node, record_usage, validation_seconds
+from ranking import rank_hotels
+from model_router import LazyModel
+from observability import configure_observability
 
 # We'll import the actual agents lazily to avoid initialization issues
 _agents_cache = {}
 
-# Rate limiting configuration (3 RPM = 20 seconds between calls)
-AGENT_RATE_LIMIT_DELAY = 21
+# The final plan streamed so far per thread, so a timed-out planner's text can be kept
+_streamed_plans: Dict[str, str] = {}
 
-logfire.configure(send_to_logfire='if-token-present')
+# Run the provider calls in the graph before prompting the recommendation agents, so each agent
+# answers in a single model round trip instead of spending a turn on a tool call
+PREFETCH_TOOL_DATA = os.getenv('PREFETCH_TOOL_DATA', 'true').lower() in ('1', 'true', 'yes')
+
+# Start the provider lookups from gather_info's partial output, while the agent is still streaming
+SPECULATIVE_PREFETCH = os.getenv('SPECULATIVE_PREFETCH', 'true').lower() in ('1', 'true', 'yes')
+
+# A complete MM-DD travel date; partial output like "06-1" would otherwise be searched as June 1st
+TRAVEL_DATE = re.compile(r'^\d{2}-\d{2}$')
+
+# How the recommendation nodes and the final plan are produced (override per run with
+# configurable["planning_mode"]):
+#   agents   - each recommendation node and the final plan is a model call (the default)
+#   fast     - flights, hotels and weather are ranked and rendered in Python; only the final plan is a model call
+#   template - like fast, and the final plan is rendered from a template too (no model call after gather_info)
+PLANNING_MODES = ("agents", "fast", "template")
+PLANNING_MODE = os.getenv('PLANNING_MODE', 'agents').lower()
+
+# Share of the run's remaining time budget each node may use. The recommendation nodes run in
+# parallel and leave the rest for the final plan, which may use everything that is left.
+RECOMMENDATION_BUDGET_SHARE = 0.6
+FINAL_PLAN_BUDGET_SHARE = 1.0
+
+# The compiled graph, built on first use by get_travel_agent_graph
+_graph = None
+_graph_lock = threading.Lock()
 
 def get_agents():
     """Lazily import and cache agents to avoid initialization issues."""
@@ -53,9 +91,10 @@ def get_agents():
 
 # Define the state for our graph
 class TravelState(TypedDict):
-    # Chat messages and travel details
+    # Chat messages and travel details. The info gathering transcript lives in the message
+    # history store; the state only records how many of the thread's rows belong to it.
     user_input: str
-    messages: Annotated[List[bytes], lambda x, y: x + y]
+    message_count: int
     travel_details: Dict[str, Any]
 
     # User preferences
@@ -63,25 +102,80 @@ class TravelState(TypedDict):
     hotel_amenities: List[str]
     budget_level: str
     
-    # Results from each agent
-    flight_results: str
-    hotel_results: str
-    activity_results: str
+    # Results from each agent (model_dump of FlightRecommendations, HotelRecommendations and
+    # ActivityRecommendations), so they can be checkpointed and read without another model call
+    flight_results: Dict[str, Any]
+    hotel_results: Dict[str, Any]
+    activity_results: Dict[str, Any]
     
     # Final summary
     final_plan: str
 
+# Provider lookups the recommendation nodes prefetch, keyed by slot. Only lookups whose
+# arguments are all known are returned, so this also works on partial travel details.
+def provider_lookups(travel_details: Dict[str, Any], state: TravelState) -> Dict[str, Any]:
+    destination = travel_details.get('destination')
+    origin = travel_details.get('origin')
+    date_leaving = travel_details.get('date_leaving')
+    date_returning = travel_details.get('date_returning')
+    max_hotel_price = travel_details.get('max_hotel_price')
+
+    lookups = {}
+    if origin and destination and date_leaving:
+        lookups["outbound_flights"] = (find_flights, (state.get('preferred_airlines', []), origin, destination, date_leaving))
+    if origin and destination and date_returning:
+        lookups["return_flights"] = (find_flights, (state.get('preferred_airlines', []), destination, origin, date_returning))
+    if destination and date_leaving and date_returning and max_hotel_price:
+        lookups["hotels"] = (find_hotels, (state.get('hotel_amenities', []), state.get('budget_level'), destination, date_leaving, date_returning, max_hotel_price))
+    if destination and date_leaving:
+        lookups["weather"] = (describe_weather, (destination, date_leaving))
+    return lookups
+
+def settled_details(travel_details: TravelDetails, message: ModelResponse, last: bool) -> Dict[str, Any]:
+    """
+    The travel details from a partial result that won't change any more, for speculative lookups.
+
+    The field the model is still generating (the last one in its partial arguments) is left out
+    until the next field starts or the stream ends, and so are incomplete dates.
+    """
+    details = travel_details.model_dump()
+    if not last:
+        streamed = []
+        for part in message.parts:
+            if isinstance(part, ToolCallPart):
+                try:
+                    args = part.args if isinstance(part.args, dict) else pydantic_core.from_json(part.args or '{}', allow_partial='trailing-strings')
+                except ValueError:
+                    return {}
+                streamed.extend(args)
+        if streamed:
+            details[streamed[-1]] = None
+    for field in ('date_leaving', 'date_returning'):
+        if not TRAVEL_DATE.match(str(details.get(field) or '')):
+            details[field] = None
+    return details
+
+def planning_mode(config: RunnableConfig) -> str:
+    """The run's planning mode: configurable["planning_mode"] if given, otherwise PLANNING_MODE."""
+    mode = (config.get("configurable") or {}).get("planning_mode") or PLANNING_MODE
+    return mode if mode in PLANNING_MODES else "agents"
+
+async def prefetched_lookup(config: RunnableConfig, slot: str, lookups: Dict[str, Any]) -> Any:
+    """Run one provider lookup, reusing the speculative one gather_info started if it matches."""
+    func, args = lookups[slot]
+    return await speculative_prefetcher.result(config["configurable"]["thread_id"], slot, func, *args)
+
 # Node functions for the graph
 
 # Info gathering node
-async def gather_info(state: TravelState) -> Dict[str, Any]:
+async def gather_info(state: TravelState, config: RunnableConfig) -> Dict[str, Any]:
     """Gather necessary travel information from the user."""
     user_input = state["user_input"]
+    thread_id = config["configurable"]["thread_id"]
+    message_count = state.get("message_count", 0)
 
-    # Get the message history into the format for Pydantic AI
-    message_history: list[ModelMessage] = []
-    for message_row in state['messages']:
-        message_history.extend(ModelMessagesTypeAdapter.validate_json(message_row))    
+    # Get the message history into the format for Pydantic AI (only rows added since the last turn are decoded)
+    message_history: list[ModelMessage] = message_history_store.load(thread_id, message_count)
     
     # Get agents lazily
     agents = get_agents()
@@ -95,10 +189,17 @@ async def gather_info(state: TravelState) -> Dict[str, Any]:
     async with info_gathering_agent.run_stream(user_input, message_history=message_history) as result:
         async for message, last in result.stream_structured(debounce_by=0.01):
             try:
-                travel_details = await result.validate_structured_result(
-                    message,
-                    allow_partial=not last
-                )
+                validation_start = time.perf_counter()
+                try:
+                    travel_details = await result.validate_structured_result(
+                        message,
+                        allow_partial=not last
+                    )
+                finally:
+                    validation_seconds.observe(time.perf_counter() - validation_start, agent="info_gathering")
+                # Start the lookups the details known so far allow, replacing any made stale by new tokens
+                if SPECULATIVE_PREFETCH and (PREFETCH_TOOL_DATA or planning_mode(config) != "agents"):
+                    speculative_prefetcher.update(thread_id, provider_lookups(settled_details(travel_details, message, last), state))
                 # If this is the last message and we have valid travel details, break
                 if last:
                     break
@@ -106,6 +207,8 @@ async def gather_info(state: TravelState) -> Dict[str, Any]:
                 # If validation fails, continue to get more content
                 continue
 
+    record_usage("info_gathering", result.usage())
+
     # Post-process: Override all_details_given based on actual data
     travel_data = travel_details.model_dump()
 
@@ -121,14 +224,17 @@ async def gather_info(state: TravelState) -> Dict[str, Any]:
     # Override the all_details_given field based on actual data
     travel_data['all_details_given'] = all_fields_present
 
+    # Store this turn's messages once, outside the checkpointed state
+    message_count = message_history_store.append(thread_id, message_count, result.new_messages(), result.new_messages_json())
+
     # Return the corrected travel details
     return {
         "travel_details": travel_data,
-        "messages": [result.new_messages_json()]
+        "message_count": message_count
     }
 
 # Flight recommendation node
-async def get_flight_recommendations(state: TravelState) -> Dict[str, Any]:
+async def get_flight_recommendations(state: TravelState, config: RunnableConfig) -> Dict[str, Any]:
     """Get flight recommendations based on travel details."""
     travel_details = state["travel_details"]
     preferred_airlines = state['preferred_airlines']
@@ -136,24 +242,45 @@ async def get_flight_recommendations(state: TravelState) -> Dict[str, Any]:
     # Create flight dependencies (in a real app, this would come from user preferences)
     flight_dependencies = FlightDeps(preferred_airlines=preferred_airlines)
     
+    if planning_mode(config) != "agents":
+        # Fast path: the searches already rank by preferred airline and price, so take the best round trips as they are
+        lookups = provider_lookups(travel_details, state)
+        if "outbound_flights" not in lookups or "return_flights" not in lookups:
+            notes = "Flights can't be searched without the origin, destination and both travel dates."
+            return {"flight_results": FlightRecommendations(notes=notes).model_dump()}
+        outbound, inbound = await asyncio.gather(
+            prefetched_lookup(config, "outbound_flights", lookups),
+            prefetched_lookup(config, "return_flights", lookups)
+        )
+        round_trips = json.loads(pair_round_trips(outbound, inbound, preferred_airlines))
+        return {"flight_results": recommend_round_trips(round_trips).model_dump()}
+
     # Prepare the prompt for the flight agent
     prompt = f"I need flight recommendations from {travel_details['origin']} to {travel_details['destination']} on {travel_details['date_leaving']}. Return flight on {travel_details['date_returning']}."
+
+    lookups = provider_lookups(travel_details, state)
+    if PREFETCH_TOOL_DATA and "outbound_flights" in lookups and "return_flights" in lookups:
+        # Search both directions concurrently (or pick up the speculative searches) and hand the results to the agent directly
+        outbound, inbound = await asyncio.gather(
+            prefetched_lookup(config, "outbound_flights", lookups),
+            prefetched_lookup(config, "return_flights", lookups)
+        )
+        prompt += f"\n\nRound-trip search results (cheapest combinations first):\n{pair_round_trips(outbound, inbound, preferred_airlines)}"
+        flight_dependencies.prefetched = True
     
     # Get agents lazily
     agents = get_agents()
     flight_agent = agents['flight']
 
-    # Add delay to respect rate limits
-    await asyncio.sleep(AGENT_RATE_LIMIT_DELAY)
-
-    # Call the flight agent
+    # Call the flight agent (rate limits are enforced by the shared limiter in the model client)
     result = await flight_agent.run(prompt, deps=flight_dependencies)
+    record_usage("flight", result.usage())
 
     # Return the flight recommendations
-    return {"flight_results": result.data}
+    return {"flight_results": result.data.model_dump()}
 
 # Hotel recommendation node
-async def get_hotel_recommendations(state: TravelState) -> Dict[str, Any]:
+async def get_hotel_recommendations(state: TravelState, config: RunnableConfig) -> Dict[str, Any]:
     """Get hotel recommendations based on travel details."""
     travel_details = state["travel_details"]
     hotel_amenities = state['hotel_amenities']
@@ -165,63 +292,87 @@ async def get_hotel_recommendations(state: TravelState) -> Dict[str, Any]:
         budget_level=budget_level
     )
     
+    if planning_mode(config) != "agents":
+        # Fast path: find_hotels already filters by price and ranks by amenities and budget level
+        lookups = provider_lookups(travel_details, state)
+        if "hotels" not in lookups:
+            notes = "Hotels can't be searched without the destination, both travel dates and a maximum price per night."
+            return {"hotel_results": HotelRecommendations(notes=notes).model_dump()}
+        hotels = await prefetched_lookup(config, "hotels", lookups)
+        return {"hotel_results": recommend_hotels(json.loads(hotels), max_price=travel_details.get('max_hotel_price') or None).model_dump()}
+
     # Prepare the prompt for the hotel agent
     prompt = f"I need hotel recommendations in {travel_details['destination']} from {travel_details['date_leaving']} to {travel_details['date_returning']} with a maximum price of ${travel_details['max_hotel_price']} per night."
+
+    lookups = provider_lookups(travel_details, state)
+    if PREFETCH_TOOL_DATA and "hotels" in lookups:
+        # Run the hotel search up front (or pick up the speculative one) and hand the results to the agent directly
+        hotels = await prefetched_lookup(config, "hotels", lookups)
+        prompt += f"\n\nHotel search results:\n{hotels}"
+        hotel_dependencies.prefetched = True
     
     # Get agents lazily
     agents = get_agents()
     hotel_agent = agents['hotel']
 
-    # Add delay to respect rate limits
-    await asyncio.sleep(AGENT_RATE_LIMIT_DELAY)
-
-    # Call the hotel agent
+    # Call the hotel agent (rate limits are enforced by the shared limiter in the model client)
     result = await hotel_agent.run(prompt, deps=hotel_dependencies)
+    record_usage("hotel", result.usage())
 
     # Return the hotel recommendations
-    return {"hotel_results": result.data}
+    return {"hotel_results": result.data.model_dump()}
 
 # Activity recommendation node
-async def get_activity_recommendations(state: TravelState) -> Dict[str, Any]:
+async def get_activity_recommendations(state: TravelState, config: RunnableConfig) -> Dict[str, Any]:
     """Get activity recommendations based on travel details."""
     travel_details = state["travel_details"]
+    activity_dependencies = ActivityDeps()
     
+    if planning_mode(config) != "agents":
+        # Fast path: pass on the forecast; the final plan suggests activities that suit it
+        lookups = provider_lookups(travel_details, state)
+        if "weather" not in lookups:
+            notes = "The weather can't be looked up without the destination and departure date."
+            return {"activity_results": ActivityRecommendations(notes=notes).model_dump()}
+        weather = await prefetched_lookup(config, "weather", lookups)
+        return {"activity_results": ActivityRecommendations(weather=weather).model_dump()}
+
     # Prepare the prompt for the activity agent
     prompt = f"I need activity recommendations for {travel_details['destination']} from {travel_details['date_leaving']} to {travel_details['date_returning']}."
+
+    lookups = provider_lookups(travel_details, state)
+    if PREFETCH_TOOL_DATA and "weather" in lookups:
+        # Fetch the weather up front (or pick up the speculative lookup) and hand it to the agent directly
+        weather = await prefetched_lookup(config, "weather", lookups)
+        prompt += f"\n\nWeather forecast:\n{weather}"
+        activity_dependencies.prefetched = True
     
     # Get agents lazily
     agents = get_agents()
     activity_agent = agents['activity']
 
-    # Add delay to respect rate limits (3 RPM = 20 seconds between calls)
-    await asyncio.sleep(21)
-
-    # Call the activity agent
-    result = await activity_agent.run(prompt)
+    # Call the activity agent (rate limits are enforced by the shared limiter in the model client)
+    result = await activity_agent.run(prompt, deps=activity_dependencies)
+    record_usage("activity", result.usage())
 
     # Return the activity recommendations
-    return {"activity_results": result.data}
+    return {"activity_results": result.data.model_dump()}
 
 # Final planning node
-async def create_final_plan(state: TravelState) -> Dict[str, Any]:
-    """Create a final travel plan based on all recommendations."""
+async def create_final_plan(state: TravelState, config: RunnableConfig, writer: StreamWriter) -> Dict[str, Any]:
+    """Create a final travel plan based on all recommendations, streaming it as it is generated."""
     travel_details = state["travel_details"]
-    flight_results = state["flight_results"]
-    hotel_results = state["hotel_results"]
-    activity_results = state["activity_results"]
-    
-    # Prepare the prompt for the final planner agent
+
+    if planning_mode(config) == "template":
+        final_plan = render_plan(state)
+        writer({"final_plan_delta": final_plan})
+        return {"final_plan": final_plan}
+
+    # Prepare the prompt for the final planner agent from the compact form of each agent's results
     prompt = f"""
     I'm planning a trip to {travel_details['destination']} from {travel_details['origin']} on {travel_details['date_leaving']} and returning on {travel_details['date_returning']}.
     
-    Here are the flight recommendations:
-    {flight_results}
-    
-    Here are the hotel recommendations:
-    {hotel_results}
-    
-    Here are the activity recommendations:
-    {activity_results}
+    {compact_results(state)}
     
     Please create a comprehensive travel plan based on these recommendations.
     """
@@ -230,14 +381,121 @@ async def create_final_plan(state: TravelState) -> Dict[str, Any]:
     agents = get_agents()
     final_planner_agent = agents['final_planner']
 
-    # Add delay to respect rate limits (3 RPM = 20 seconds between calls)
-    await asyncio.sleep(21)
-
-    # Call the final planner agent
-    result = await final_planner_agent.run(prompt)
+    # Stream the final planner agent (rate limits are enforced by the shared limiter in the model client).
+    # Each text delta is emitted on the graph's "custom" stream so the UI can render tokens as they arrive.
+    thread_id = config["configurable"]["thread_id"]
+    final_plan = ""
+    try:
+        async with final_planner_agent.run_stream(prompt) as result:
+            async for delta in result.stream_text(delta=True, debounce_by=0.05):
+                final_plan += delta
+                _streamed_plans[thread_id] = final_plan
+                writer({"final_plan_delta": delta})
+    finally:
+        # When cancelled for running out of time, degraded_final_plan picks up what was already streamed
+        if not asyncio.current_task().cancelling():
+            _streamed_plans.pop(thread_id, None)
+    record_usage("final_planner", result.usage())
 
     # Return the final plan
-    return {"final_plan": result.data}
+    return {"final_plan": final_plan}
+
+def compact_results(state: TravelState) -> str:
+    """The flight, hotel and activity results in the compact form the final planner is prompted with."""
+    return (
+        f"Flights:\n{FlightRecommendations.model_validate(state.get('flight_results') or {}).compact()}\n\n"
+        f"Hotels:\n{HotelRecommendations.model_validate(state.get('hotel_results') or {}).compact()}\n\n"
+        f"Activities:\n{ActivityRecommendations.model_validate(state.get('activity_results') or {}).compact()}"
+    )
+
+def render_plan(state: TravelState) -> str:
+    """Render the final plan from the structured recommendations without a model call."""
+    travel_details = state["travel_details"]
+    flights = FlightRecommendations.model_validate(state.get('flight_results') or {})
+    hotels = HotelRecommendations.model_validate(state.get('hotel_results') or {})
+    activities = ActivityRecommendations.model_validate(state.get('activity_results') or {})
+
+    lines = [
+        f"## Your trip to {travel_details['destination']}",
+        f"{travel_details['origin']} to {travel_details['destination']}, {travel_details['date_leaving']} to {travel_details['date_returning']}",
+        "",
+        "### Flights"
+    ]
+    for i, option in enumerate(flights.options, 1):
+        price = f" - {option.price:g} {option.currency}" if option.price is not None else ""
+        lines.append(f"{i}. **{option.airline}**{price}: out {option.outbound}" + (f", back {option.inbound}" if option.inbound else ""))
+    if not flights.options:
+        lines.append(flights.notes or "No flights found for these dates.")
+
+    lines += ["", "### Hotels"]
+    for i, option in enumerate(hotels.options, 1):
+        price = f" - {option.price_per_night:g} {option.currency} per night" if option.price_per_night is not None else ""
+        details = ", ".join(filter(None, [option.location, f"rated {option.rating:g}" if option.rating is not None else None, ", ".join(option.amenities)]))
+        lines.append(f"{i}. **{option.name}**{price}" + (f" ({details})" if details else ""))
+    if not hotels.options:
+        lines.append(hotels.notes or "No hotels found within your budget.")
+
+    lines += ["", "### Weather and activities"]
+    lines.append(activities.weather or "No forecast available.")
+    lines += [f"- {activity.name}" + (f" ({activity.day})" if activity.day else "") for activity in activities.activities]
+    return "\n".join(lines)
+
+# Degraded results for nodes that run out of time: whatever the response cache already holds,
+# without another provider or model call
+def degraded_flight_results(state: TravelState) -> Dict[str, Any]:
+    travel_details = state["travel_details"]
+    outbound = search_flights_api.peek(travel_details['origin'], travel_details['destination'], travel_details['date_leaving'])
+    inbound = search_flights_api.peek(travel_details['destination'], travel_details['origin'], travel_details['date_returning'])
+    if not outbound or not inbound:
+        return {"flight_results": FlightRecommendations(notes="Flight recommendations are unavailable right now.").model_dump()}
+    round_trips = json.loads(pair_round_trips(json.dumps(outbound), json.dumps(inbound), state.get('preferred_airlines') or []))
+    notes = "Flight recommendations timed out; these are the cheapest recent search results."
+    return {"flight_results": recommend_round_trips(round_trips, notes=notes).model_dump()}
+
+def degraded_hotel_results(state: TravelState) -> Dict[str, Any]:
+    travel_details = state["travel_details"]
+    destination = resolve_hotel_destination.peek(travel_details['destination'])
+    max_price = travel_details.get('max_hotel_price') or None
+    hotels = None
+    if destination and 'error' not in destination:
+        check_in, check_out = format_hotel_dates(travel_details['date_leaving'], travel_details['date_returning'])
+        hotels = search_hotels_page.peek(destination['dest_id'], destination['dest_type'], travel_details['destination'],
+                                         check_in, check_out, adults=2, page_number=0)
+    if hotels and 'error' not in hotels[0]:
+        # Same price filter and ranking as find_hotels applies to a fresh search
+        hotels = rank_hotels(within_budget(hotels, max_price), state['hotel_amenities'], state['budget_level'])
+    if not hotels:
+        return {"hotel_results": HotelRecommendations(notes="Hotel recommendations are unavailable right now.").model_dump()}
+    notes = "Hotel recommendations timed out; these are recent search results."
+    return {"hotel_results": recommend_hotels(hotels, notes=notes, max_price=max_price).model_dump()}
+
+def degraded_activity_results(state: TravelState) -> Dict[str, Any]:
+    travel_details = state["travel_details"]
+    weather = get_weather_data.peek(travel_details['destination'])
+    if not weather or 'error' in weather:
+        return {"activity_results": ActivityRecommendations(notes="Activity recommendations are unavailable right now.").model_dump()}
+    return {"activity_results": ActivityRecommendations(
+        weather=summarize_weather(travel_details['destination'], travel_details['date_leaving'], weather),
+        notes="Activity recommendations timed out."
+    ).model_dump()}
+
+def degraded_final_plan(state: TravelState) -> Dict[str, Any]:
+    """Finish the plan when the final planner runs out of time, keeping any text it already streamed."""
+    travel_details = state["travel_details"]
+    streamed = _streamed_plans.pop(get_config()["configurable"]["thread_id"], "")
+    if streamed:
+        # The UI already shows this text, so end it with a note rather than starting over
+        note = "\n\n_This plan was cut short to stay within the time limit._"
+        get_stream_writer()({"final_plan_delta": note})
+        return {"final_plan": streamed + note}
+
+    final_plan = (
+        f"\n\nHere is what I found for your trip to {travel_details['destination']} "
+        f"({travel_details['date_leaving']} to {travel_details['date_returning']}):\n\n"
+        f"{compact_results(state)}"
+    )
+    get_stream_writer()({"final_plan_delta": final_plan})
+    return {"final_plan": final_plan.strip()}
 
 # Conditional edge function to determine next steps after info gathering
 def route_after_info_gathering(state: TravelState):
@@ -266,13 +524,18 @@ def build_travel_agent_graph():
     # Create the graph with our state
     graph = StateGraph(TravelState)
     
-    # Add nodes
-    graph.add_node("gather_info", gather_info)
-    graph.add_node("get_next_user_message", get_next_user_message)
-    graph.add_node("get_flight_recommendations", get_flight_recommendations)
-    graph.add_node("get_hotel_recommendations", get_hotel_recommendations)
-    graph.add_node("get_activity_recommendations", get_activity_recommendations)
-    graph.add_node("create_final_plan", create_final_plan)
+    # Add nodes (each one is wrapped to record its latency, concurrency and errors). The recommendation
+    # and planning nodes also get a share of the run's deadline and degrade instead of overrunning it.
+    graph.add_node("gather_info", instrument_node("gather_info", gather_info))
+    graph.add_node("get_next_user_message", instrument_node("get_next_user_message", get_next_user_message))
+    graph.add_node("get_flight_recommendations", instrument_node("get_flight_recommendations", with_budget(
+        "get_flight_recommendations", get_flight_recommendations, RECOMMENDATION_BUDGET_SHARE, degraded_flight_results)))
+    graph.add_node("get_hotel_recommendations", instrument_node("get_hotel_recommendations", with_budget(
+        "get_hotel_recommendations", get_hotel_recommendations, RECOMMENDATION_BUDGET_SHARE, degraded_hotel_results)))
+    graph.add_node("get_activity_recommendations", instrument_node("get_activity_recommendations", with_budget(
+        "get_activity_recommendations", get_activity_recommendations, RECOMMENDATION_BUDGET_SHARE, degraded_activity_results)))
+    graph.add_node("create_final_plan", instrument_node("create_final_plan", with_budget(
+        "create_final_plan", create_final_plan, FINAL_PLAN_BUDGET_SHARE, degraded_final_plan)))
     
     # Add edges
     graph.add_edge(START, "gather_info")
@@ -295,12 +558,60 @@ def build_travel_agent_graph():
     # Connect final planning to END
     graph.add_edge("create_final_plan", END)
     
-    # Compile the graph
-    memory = MemorySaver()
-    return graph.compile(checkpointer=memory)
+    # Compile the graph with a durable checkpointer so conversations survive restarts
+    checkpointer = SqliteCheckpointSaver()
+    return graph.compile(checkpointer=checkpointer)
+
+def get_travel_agent_graph():
+    """Get the compiled travel agent graph, setting up observability and compiling it on first use."""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            configure_observability()
+            _graph = build_travel_agent_graph()
+        return _graph
+
+def __getattr__(name: str):
+    # langgraph.json refers to `travel_agent_graph`, which is compiled when it's first looked up
+    if name == "travel_agent_graph":
+        return get_travel_agent_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def prepare_agents() -> Dict[str, float]:
+    """
+    Do the one-off work the first request would otherwise pay for: observability setup, the
+    compiled graph, the agents with their tool schemas, and their models and LLM client.
+    Returns the seconds spent on each step.
+    """
+    timings = {}
 
-# Create the travel agent graph
-travel_agent_graph = build_travel_agent_graph()
+    start = time.perf_counter()
+    get_travel_agent_graph()
+    timings["graph"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    agents = get_agents()
+    timings["agents"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for agent in agents.values():
+        if isinstance(agent.model, LazyModel):
+            agent.model.model
+    timings["models"] = time.perf_counter() - start
+    return timings
+
+async def warmup(open_connections: bool = True) -> Dict[str, float]:
+    """
+    Prepare the agents and, on the running loop, open the provider session and a connection to
+    the LLM endpoint, so the first message doesn't wait on imports, compilation or handshakes.
+    Returns the seconds spent on each step.
+    """
+    timings = prepare_agents()
+    if open_connections:
+        start = time.perf_counter()
+        await asyncio.gather(start_http_sessions(), warm_llm_connection())
+        timings["connections"] = time.perf_counter() - start
+    return timings
 
 # Function to run the travel agent
 async def run_travel_agent(user_input: str):
@@ -308,25 +619,50 @@ async def run_travel_agent(user_input: str):
     # Initialize the state with user input
     initial_state = {
         "user_input": user_input,
+        "preferred_airlines": [],
+        "hotel_amenities": [],
+        "budget_level": "mid-range",
         "travel_details": {},
-        "flight_results": [],
-        "hotel_results": [],
-        "activity_results": [],
+        "flight_results": {},
+        "hotel_results": {},
+        "activity_results": {},
         "final_plan": ""
     }
     
-    # Run the graph
-    result = await travel_agent_graph.ainvoke(initial_state)
+    # Run the graph within the plan's time budget
+    result = await get_travel_agent_graph().ainvoke(initial_state, deadline_config(str(uuid.uuid4())))
     
     # Return the final plan
     return result["final_plan"]
 
+async def resume_travel_agent(thread_id: str):
+    """
+    Resume a thread that was interrupted mid-run (e.g. by a crash or restart).
+
+    Recommendation nodes whose writes were already committed are not run again; only the
+    nodes that never finished are re-executed before the final plan is created.
+    """
+    config = deadline_config(thread_id)
+    snapshot = await get_travel_agent_graph().aget_state(config)
+
+    # Nothing left to run (finished, or waiting on the user for more details)
+    if not snapshot.next or snapshot.next == ("get_next_user_message",):
+        return snapshot.values.get("final_plan", "")
+
+    result = await get_travel_agent_graph().ainvoke(None, config)
+    return result.get("final_plan", "")
+
 async def main():
     # Example user input
     user_input = "I want to plan a trip from New York to Paris from 06-15 to 06-22. My max budget for a hotel is $200 per night."
     
-    # Run the travel agent
-    final_plan = await run_travel_agent(user_input)
+    # Build the agents and open pooled HTTP sessions up front, and close them cleanly on the way out
+    await warmup()
+    try:
+        # Run the travel agent
+        final_plan = await run_travel_agent(user_input)
+    finally:
+        await close_http_sessions()
     
     # Print the final plan
     print("Final Travel Plan:")
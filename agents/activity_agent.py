@@ -1,17 +1,44 @@
 from pydantic_ai import Agent, RunContext
-from typing import Any, List, Dict
+from pydantic_ai.tools import ToolDefinition
+from pydantic import BaseModel, Field
+from typing import Any, List, Dict, Optional
 from dataclasses import dataclass
-import logfire
 import json
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import get_model, get_weather_data
+from utils import get_agent_model, get_weather_data
+from metrics import instrument_tool
 
-logfire.configure(send_to_logfire='if-token-present')
+model = get_agent_model('activity')
 
-model = get_model()
+@dataclass
+class ActivityDeps:
+    # True when the graph already fetched the weather and put it in the prompt
+    prefetched: bool = False
+
+class Activity(BaseModel):
+    """One recommended activity."""
+    name: str = Field(description='What to do, e.g. "Seine river cruise"')
+    day: Optional[str] = Field(default=None, description='Suggested day or date, e.g. "Day 2" or "06-16"')
+    reason: str = Field(default='', description='One short sentence on why, e.g. how it suits the weather')
+
+class ActivityRecommendations(BaseModel):
+    """Recommended activities for the trip."""
+    weather: str = Field(default='', description='One-sentence weather summary for the trip')
+    activities: List[Activity] = Field(default_factory=list, description='At most eight recommended activities')
+    notes: str = Field(default='', description='Short caveats or tips, if any')
+
+    def compact(self) -> str:
+        """One line per activity, for the final planner's prompt."""
+        lines = [f"Weather: {self.weather}"] if self.weather else []
+        for activity in self.activities:
+            fields = [activity.day, activity.name, activity.reason]
+            lines.append("- " + " | ".join(field for field in fields if field))
+        if self.notes:
+            lines.append(f"Note: {self.notes}")
+        return "\n".join(lines) or "No activity recommendations."
 
 system_prompt = """
 You are a travel planning assistant who helps users plan their trips.
@@ -19,8 +46,9 @@ You are a travel planning assistant who helps users plan their trips.
 You can provide personalized activity recommendations based on the user's destination, duration, budget, and preferences.
 
 Use the get_weather_forecast tool to get the weather based on the location to aid in recommending the right activities.
+If the weather forecast is already included in the request, use that instead.
 
-Format your response in a clear, organized way with activities you recommend based on the weather and your reason for each.
+Recommend at most eight activities based on the weather, each with a short reason, and summarize the weather in one sentence.
 
 Never ask for clarification on any piece of information before recommending activities, just make
 your best guess for any parameters that you aren't sure of.
@@ -28,13 +56,36 @@ your best guess for any parameters that you aren't sure of.
 
 activity_agent = Agent(
     model,
+    result_type=ActivityRecommendations,
     system_prompt=system_prompt,
+    deps_type=ActivityDeps,
     retries=2
 )
 
-@activity_agent.tool_plain
+async def omit_when_prefetched(ctx: RunContext[ActivityDeps], tool_def: ToolDefinition) -> Optional[ToolDefinition]:
+    """Hide the weather tool when the forecast was prefetched, so the agent answers in one round trip."""
+    if ctx.deps is not None and ctx.deps.prefetched:
+        return None
+    return tool_def
+
+@activity_agent.tool_plain(prepare=omit_when_prefetched)
 async def get_weather_forecast(city: str, date: str) -> str:
     """Get the weather forecast for a city on a specific date."""
+    return await describe_weather(city, date)
+
+def summarize_weather(city: str, date: str, weather_info: Dict[str, Any]) -> str:
+    """Describe a weather API result in one sentence."""
+    temp = weather_info.get('temperature', 'N/A')
+    description = weather_info.get('description', 'N/A')
+    humidity = weather_info.get('humidity', 'N/A')
+    wind_speed = weather_info.get('wind_speed', 'N/A')
+    country = weather_info.get('country', '')
+
+    return f"The weather in {city}, {country} on {date} is {description} with temperature {temp}°C, humidity {humidity}%, and wind speed {wind_speed} m/s."
+
+@instrument_tool("get_weather_forecast")
+async def describe_weather(city: str, date: str) -> str:
+    """Describe the weather for a city on a date, falling back to typical conditions."""
 
     # Try to get real weather data first
     try:
@@ -42,13 +93,7 @@ async def get_weather_forecast(city: str, date: str) -> str:
 
         # If we got real data and no errors, use it
         if weather_info and 'error' not in weather_info:
-            temp = weather_info.get('temperature', 'N/A')
-            description = weather_info.get('description', 'N/A')
-            humidity = weather_info.get('humidity', 'N/A')
-            wind_speed = weather_info.get('wind_speed', 'N/A')
-            country = weather_info.get('country', '')
-
-            return f"The weather in {city}, {country} on {date} is {description} with temperature {temp}°C, humidity {humidity}%, and wind speed {wind_speed} m/s."
+            return summarize_weather(city, date, weather_info)
     except Exception as e:
         # Log the error but continue with fallback data
         print(f"Weather API error: {e}")
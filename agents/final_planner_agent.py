@@ -1,14 +1,11 @@
 from pydantic_ai import Agent
-import logfire
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import get_model
+from utils import get_agent_model
 
-logfire.configure(send_to_logfire='if-token-present')
-
-model = get_model()
+model = get_agent_model('final_planner')
 
 system_prompt = """
 You are a travel agent expert helping people plan their perfect trip.
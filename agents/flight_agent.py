@@ -1,33 +1,70 @@
 from pydantic_ai import Agent, RunContext
-from typing import Any, List, Dict
+from pydantic_ai.tools import ToolDefinition
+from pydantic import BaseModel, Field
+from typing import Any, List, Dict, Optional
 from dataclasses import dataclass
-import logfire
+import asyncio
 import json
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import get_model, search_flights_api
+from utils import get_agent_model, search_flights_api, search_flight_price_calendar, parse_price
+from metrics import instrument_tool
+from ranking import rank_flights
 
-logfire.configure(send_to_logfire='if-token-present')
-
-model = get_model()
+model = get_agent_model('flight')
 
 @dataclass
 class FlightDeps:
     preferred_airlines: List[str]
+    # True when the graph already ran the flight search and put the results in the prompt
+    prefetched: bool = False
+
+class FlightOption(BaseModel):
+    """One recommended flight or round trip."""
+    airline: str = Field(description='Airline name or code')
+    outbound: str = Field(description='Outbound flight number, times and stops, e.g. "DL 264 18:30-07:55 direct"')
+    inbound: Optional[str] = Field(default=None, description='Return flight in the same format, if there is one')
+    price: Optional[float] = Field(default=None, description='Total price of the option')
+    currency: str = Field(default='USD', description='Currency of the price')
+    reason: str = Field(default='', description='One short sentence on why this option is recommended')
+
+class FlightRecommendations(BaseModel):
+    """Recommended flights for the trip, best first."""
+    options: List[FlightOption] = Field(default_factory=list, description='At most three recommended options, best first')
+    notes: str = Field(default='', description='Short caveats or tips, if any')
+
+    def compact(self) -> str:
+        """One line per option, for the final planner's prompt."""
+        lines = []
+        for i, option in enumerate(self.options, 1):
+            fields = [option.airline, f"out {option.outbound}"]
+            if option.inbound:
+                fields.append(f"back {option.inbound}")
+            if option.price is not None:
+                fields.append(f"{option.price:g} {option.currency}")
+            if option.reason:
+                fields.append(option.reason)
+            lines.append(f"{i}. " + " | ".join(fields))
+        if self.notes:
+            lines.append(f"Note: {self.notes}")
+        return "\n".join(lines) or "No flight recommendations."
 
 system_prompt = """
 You are a flight specialist who helps users find the best flights for their trips.
 
-Use the search_flights tool to find flight options, and then provide personalized recommendations
-based on the user's preferences (price, time, direct vs. connecting).
+Use the search_round_trip tool to find outbound and return options in one call (or search_flights
+for one-way trips), and then provide personalized recommendations
+based on the user's preferences (price, time, direct vs. connecting). If flight search results
+are already included in the request, base your recommendations on those instead.
 
-The user's preferences are available in the context, including preferred airlines.
+If the user's dates are flexible, use the search_flexible_dates tool to compare fares across nearby
+days in a single call and recommend the cheapest departure date.
 
-Always explain the reasoning behind your recommendations.
+The user's preferences are available in the context, including preferred airlines.
 
-Format your response in a clear, organized way with flight details and prices.
+Recommend at most three options, best first, each with a short reason. Keep notes to a sentence or two.
 
 Never ask for clarification on any piece of information before recommending flights, just make
 your best guess for any parameters that you aren't sure of.
@@ -35,14 +72,107 @@ your best guess for any parameters that you aren't sure of.
 
 flight_agent = Agent(
     model,
+    result_type=FlightRecommendations,
     system_prompt=system_prompt,
     deps_type=FlightDeps,
     retries=2
 )
 
-@flight_agent.tool
+async def omit_when_prefetched(ctx: RunContext[FlightDeps], tool_def: ToolDefinition) -> Optional[ToolDefinition]:
+    """Hide the search tool when the results were prefetched, so the agent answers in one round trip."""
+    if ctx.deps is not None and ctx.deps.prefetched:
+        return None
+    return tool_def
+
+@flight_agent.tool(prepare=omit_when_prefetched)
 async def search_flights(ctx: RunContext[FlightDeps], origin: str, destination: str, date: str) -> str:
     """Search for flights between two cities on a specific date, taking user preferences into account."""
+    return await find_flights(ctx.deps.preferred_airlines, origin, destination, date)
+
+@flight_agent.tool(prepare=omit_when_prefetched)
+async def search_round_trip(ctx: RunContext[FlightDeps], origin: str, destination: str, date_leaving: str, date_returning: str) -> str:
+    """Search outbound and return flights together and get paired itineraries with their combined price."""
+    return await find_round_trips(ctx.deps.preferred_airlines, origin, destination, date_leaving, date_returning)
+
+@flight_agent.tool
+async def search_flexible_dates(ctx: RunContext[FlightDeps], origin: str, destination: str, date: str, days_around: int = 3) -> str:
+    """
+    Find the cheapest fare for each departure date within days_around days (at most 7) of the given date.
+    Use this when the user's dates are flexible or they ask for the cheapest day to fly.
+    """
+    return await find_flexible_dates(origin, destination, date, days_around)
+
+@instrument_tool("search_flexible_dates")
+async def find_flexible_dates(origin: str, destination: str, date: str, days_around: int = 3) -> str:
+    """Build a compact price calendar (cheapest fare per day) around a departure date."""
+    calendar = await search_flight_price_calendar(origin, destination, date, days_around)
+
+    priced = [day for day in calendar if 'cheapest_price' in day]
+    if not priced:
+        errors = {day.get('error') for day in calendar}
+        return json.dumps({"error": f"No fares found: {', '.join(sorted(str(e) for e in errors))}"})
+
+    cheapest = min(priced, key=lambda day: day['cheapest_price'])
+    return json.dumps({"cheapest_date": cheapest['date'], "calendar": calendar})
+
+@instrument_tool("search_round_trip")
+async def find_round_trips(preferred_airlines: List[str], origin: str, destination: str, date_leaving: str, date_returning: str) -> str:
+    """Search both legs concurrently and pair them into round trips."""
+    outbound, inbound = await asyncio.gather(
+        find_flights(preferred_airlines, origin, destination, date_leaving),
+        find_flights(preferred_airlines, destination, origin, date_returning)
+    )
+    return pair_round_trips(outbound, inbound, preferred_airlines)
+
+def pair_round_trips(outbound: str, inbound: str, preferred_airlines: List[str], limit: int = 5) -> str:
+    """Combine outbound and return search results (as returned by find_flights) into the cheapest round trips."""
+    outbound_flights = [(parse_price(f.get("price")), f) for f in json.loads(outbound)]
+    inbound_flights = [(parse_price(f.get("price")), f) for f in json.loads(inbound)]
+
+    round_trips = [
+        {
+            "total_price": round(out_price + in_price, 2),
+            "same_airline": out_flight.get("airline") == in_flight.get("airline"),
+            "outbound": out_flight,
+            "return": in_flight
+        }
+        for out_price, out_flight in outbound_flights if out_price is not None
+        for in_price, in_flight in inbound_flights if in_price is not None
+    ]
+
+    # Preferred airlines first, then the cheapest combined price
+    round_trips.sort(key=lambda trip: (
+        not (trip["outbound"].get("airline") in preferred_airlines and trip["return"].get("airline") in preferred_airlines),
+        trip["total_price"]
+    ))
+    return json.dumps(round_trips[:limit])
+
+def describe_flight(flight: Dict[str, Any]) -> str:
+    """A flight search result as a short leg description like "DL 264 18:30-07:55 direct"."""
+    stops = "direct" if flight.get("direct") else "connecting"
+    return f"{flight.get('flight_number', '')} {flight.get('departure_time', '')}-{flight.get('arrival_time', '')} {stops}".strip()
+
+def recommend_round_trips(round_trips: List[Dict[str, Any]], limit: int = 3, notes: str = "") -> FlightRecommendations:
+    """Turn paired round trips (as returned by pair_round_trips) into recommendations without a model call."""
+    return FlightRecommendations(
+        options=[
+            FlightOption(
+                airline=trip["outbound"].get("airline", ""),
+                outbound=describe_flight(trip["outbound"]),
+                inbound=describe_flight(trip["return"]),
+                price=trip["total_price"],
+                # Amadeus prices read like "245.50 EUR"
+                currency=str(trip["outbound"].get("price", "")).partition(" ")[2] or "USD",
+                reason="Preferred airline" if trip["outbound"].get("preferred") else "Low combined price"
+            )
+            for trip in round_trips[:limit]
+        ],
+        notes=notes
+    )
+
+@instrument_tool("search_flights")
+async def find_flights(preferred_airlines: List[str], origin: str, destination: str, date: str) -> str:
+    """Search for flights and apply the user's airline preferences, falling back to mock data."""
 
     # Try to get real flight data first
     try:
@@ -51,18 +181,14 @@ async def search_flights(ctx: RunContext[FlightDeps], origin: str, destination:
         # If we got real data and no errors, use it
         if real_flights and not any('error' in flight for flight in real_flights):
             # Apply user preferences if available
-            if ctx.deps.preferred_airlines:
-                preferred_airlines = ctx.deps.preferred_airlines
-                if preferred_airlines:
-                    # Add preference matching
-                    for flight in real_flights:
-                        if flight.get("airline") in preferred_airlines:
-                            flight["preferred"] = True
-
-                    # Sort by preference
-                    real_flights.sort(key=lambda x: not x.get("preferred", False))
-
-            return json.dumps(real_flights)
+            if preferred_airlines:
+                # Add preference matching
+                for flight in real_flights:
+                    if flight.get("airline") in preferred_airlines:
+                        flight["preferred"] = True
+
+            # Rank by price, duration, stops and preference
+            return json.dumps(rank_flights(real_flights, preferred_airlines))
     except Exception as e:
         # Log the error but continue with fallback data
         print(f"Flight API error: {e}")
@@ -102,15 +228,10 @@ async def search_flights(ctx: RunContext[FlightDeps], origin: str, destination:
     ]
 
     # Apply user preferences if available
-    if ctx.deps.preferred_airlines:
-        preferred_airlines = ctx.deps.preferred_airlines
-        if preferred_airlines:
-            # Move preferred airlines to the top of the list
-            flight_options.sort(key=lambda x: x["airline"] not in preferred_airlines)
-
-            # Add a note about preference matching
-            for flight in flight_options:
-                if flight["airline"] in preferred_airlines:
-                    flight["preferred"] = True
-
-    return json.dumps(flight_options)
\ No newline at end of file
+    if preferred_airlines:
+        # Add a note about preference matching
+        for flight in flight_options:
+            if flight["airline"] in preferred_airlines:
+                flight["preferred"] = True
+
+    return json.dumps(rank_flights(flight_options, preferred_airlines))
\ No newline at end of file
@@ -1,34 +1,71 @@
 from pydantic_ai import Agent, RunContext
-from typing import List, Dict, Optional
+from pydantic_ai.tools import ToolDefinition
+from pydantic import BaseModel, Field
+from typing import Any, List, Dict, Optional
 from dataclasses import dataclass
-import logfire
 import json
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import get_model, search_hotels_api
+from utils import get_agent_model, search_hotels_api
+from metrics import instrument_tool
+from ranking import rank_hotels
 
-logfire.configure(send_to_logfire='if-token-present')
-
-model = get_model()
+model = get_agent_model('hotel')
 
 @dataclass
 class HotelDeps:
     hotel_amenities: List[str]
     budget_level: str
+    # True when the graph already ran the hotel search and put the results in the prompt
+    prefetched: bool = False
+
+class HotelOption(BaseModel):
+    """One recommended hotel."""
+    name: str = Field(description='Hotel name')
+    price_per_night: Optional[float] = Field(default=None, description='Price per night')
+    currency: str = Field(default='USD', description='Currency of the price')
+    rating: Optional[float] = Field(default=None, description='Guest rating, if known')
+    location: Optional[str] = Field(default=None, description='Neighbourhood or district')
+    amenities: List[str] = Field(default_factory=list, description="Amenities that match the user's preferences")
+    reason: str = Field(default='', description='One short sentence on why this hotel is recommended')
+
+class HotelRecommendations(BaseModel):
+    """Recommended hotels for the trip, best first."""
+    options: List[HotelOption] = Field(default_factory=list, description='At most three recommended hotels, best first')
+    notes: str = Field(default='', description='Short caveats or tips, if any')
+
+    def compact(self) -> str:
+        """One line per hotel, for the final planner's prompt."""
+        lines = []
+        for i, option in enumerate(self.options, 1):
+            fields = [option.name]
+            if option.price_per_night is not None:
+                fields.append(f"{option.price_per_night:g} {option.currency}/night")
+            if option.rating is not None:
+                fields.append(f"rated {option.rating:g}")
+            if option.location:
+                fields.append(option.location)
+            if option.amenities:
+                fields.append(", ".join(option.amenities))
+            if option.reason:
+                fields.append(option.reason)
+            lines.append(f"{i}. " + " | ".join(fields))
+        if self.notes:
+            lines.append(f"Note: {self.notes}")
+        return "\n".join(lines) or "No hotel recommendations."
 
 system_prompt = """
 You are a hotel specialist who helps users find the best accommodations for their trips.
 
 Use the search_hotels tool to find hotel options, and then provide personalized recommendations
-based on the user's preferences (location, amenities, price range).
+based on the user's preferences (location, amenities, price range). If hotel search results
+are already included in the request, base your recommendations on those instead.
 
 The user's preferences are available in the context, including preferred amenities and budget level.
 
-Always explain the reasoning behind your recommendations.
-
-Format your response in a clear, organized way with hotel details, amenities, and prices.
+Recommend at most three hotels, best first, each with a short reason. Keep notes to a sentence or two.
 
 Never ask for clarification on any piece of information before recommending hotels, just make
 your best guess for any parameters that you aren't sure of.
@@ -36,53 +73,71 @@ your best guess for any parameters that you aren't sure of.
 
 hotel_agent = Agent(
     model,
+    result_type=HotelRecommendations,
     system_prompt=system_prompt,
     deps_type=HotelDeps,
     retries=2
 )
 
-@hotel_agent.tool
+async def omit_when_prefetched(ctx: RunContext[HotelDeps], tool_def: ToolDefinition) -> Optional[ToolDefinition]:
+    """Hide the search tool when the results were prefetched, so the agent answers in one round trip."""
+    if ctx.deps is not None and ctx.deps.prefetched:
+        return None
+    return tool_def
+
+@hotel_agent.tool(prepare=omit_when_prefetched)
 async def search_hotels(ctx: RunContext[HotelDeps], city: str, check_in: str, check_out: str, max_price: Optional[float] = None) -> str:
     """Search for hotels in a city for specific dates within a price range, taking user preferences into account."""
+    return await find_hotels(ctx.deps.hotel_amenities, ctx.deps.budget_level, city, check_in, check_out, max_price)
+
+def within_budget(hotels: List[Dict[str, Any]], max_price: Optional[float] = None) -> List[Dict[str, Any]]:
+    """The hotels with a known price per night of at most `max_price` (all of them without a limit)."""
+    if max_price is None:
+        return hotels
+    return [hotel for hotel in hotels if
+            isinstance(hotel.get("price_per_night"), (int, float)) and
+            hotel["price_per_night"] <= max_price]
+
+def recommendation_reason(hotel: Dict[str, Any], max_price: Optional[float] = None) -> str:
+    if hotel.get("matching_amenities"):
+        return "Matches your amenities"
+    if max_price is not None and within_budget([hotel], max_price):
+        return "Within budget"
+    return ""
+
+def recommend_hotels(hotels: List[Dict[str, Any]], limit: int = 3, notes: str = "", max_price: Optional[float] = None) -> HotelRecommendations:
+    """Turn hotel search results (in the order find_hotels ranks them) into recommendations without a model call."""
+    return HotelRecommendations(
+        options=[
+            HotelOption(
+                name=hotel.get("name", ""),
+                price_per_night=hotel.get("price_per_night") if isinstance(hotel.get("price_per_night"), (int, float)) else None,
+                currency=hotel.get("currency") or "USD",
+                rating=hotel.get("rating") if isinstance(hotel.get("rating"), (int, float)) else None,
+                location=hotel.get("location"),
+                amenities=hotel.get("matching_amenities") or hotel.get("amenities", [])[:5],
+                reason=recommendation_reason(hotel, max_price)
+            )
+            for hotel in hotels[:limit] if "error" not in hotel
+        ],
+        notes=notes
+    )
+
+@instrument_tool("search_hotels")
+async def find_hotels(preferred_amenities: List[str], budget_level: str, city: str, check_in: str, check_out: str, max_price: Optional[float] = None) -> str:
+    """Search for hotels and apply the user's amenity and budget preferences, falling back to mock data."""
 
     # Try to get real hotel data first
     try:
-        real_hotels = await search_hotels_api(city, check_in, check_out)
+        real_hotels = await search_hotels_api(city, check_in, check_out, max_price=max_price, amenities=preferred_amenities)
 
         # If we got real data and no errors, use it
         if real_hotels and not any('error' in hotel for hotel in real_hotels):
             # Filter by max price if provided
-            if max_price is not None:
-                filtered_hotels = [hotel for hotel in real_hotels if
-                                 isinstance(hotel.get("price_per_night"), (int, float)) and
-                                 hotel["price_per_night"] <= max_price]
-            else:
-                filtered_hotels = real_hotels
-
-            # Apply user preferences if available
-            preferred_amenities = ctx.deps.hotel_amenities
-            budget_level = ctx.deps.budget_level
-
-            # Sort hotels by preference match
-            if preferred_amenities and filtered_hotels:
-                # Calculate a score based on how many preferred amenities each hotel has
-                for hotel in filtered_hotels:
-                    hotel_amenities = hotel.get("amenities", [])
-                    matching_amenities = [a for a in hotel_amenities if a in preferred_amenities]
-                    hotel["matching_amenities"] = matching_amenities
-                    hotel["preference_score"] = len(matching_amenities)
-
-                # Sort by preference score (higher scores first)
-                filtered_hotels.sort(key=lambda x: x.get("preference_score", 0), reverse=True)
-
-            # Apply budget level preferences if available
-            if budget_level and filtered_hotels:
-                if budget_level == "budget":
-                    filtered_hotels.sort(key=lambda x: x.get("price_per_night", 999999))
-                elif budget_level == "luxury":
-                    filtered_hotels.sort(key=lambda x: x.get("price_per_night", 0), reverse=True)
-
-            return json.dumps(filtered_hotels)
+            filtered_hotels = within_budget(real_hotels, max_price)
+
+            # Rank by price, rating and amenity match, weighted for the budget level
+            return json.dumps(rank_hotels(filtered_hotels, preferred_amenities, budget_level))
     except Exception as e:
         # Log the error but continue with fallback data
         print(f"Hotel API error: {e}")
@@ -116,32 +171,7 @@ async def search_hotels(ctx: RunContext[HotelDeps], city: str, check_in: str, ch
     ]
 
     # Filter by max price if provided
-    if max_price is not None:
-        filtered_hotels = [hotel for hotel in hotel_options if hotel["price_per_night"] <= max_price]
-    else:
-        filtered_hotels = hotel_options
-
-    # Apply user preferences if available
-    preferred_amenities = ctx.deps.hotel_amenities
-    budget_level = ctx.deps.budget_level
-
-    # Sort hotels by preference match
-    if preferred_amenities:
-        # Calculate a score based on how many preferred amenities each hotel has
-        for hotel in filtered_hotels:
-            matching_amenities = [a for a in hotel["amenities"] if a in preferred_amenities]
-            hotel["matching_amenities"] = matching_amenities
-            hotel["preference_score"] = len(matching_amenities)
-
-        # Sort by preference score (higher scores first)
-        filtered_hotels.sort(key=lambda x: x["preference_score"], reverse=True)
-
-    # Apply budget level preferences if available
-    if budget_level:
-        if budget_level == "budget":
-            filtered_hotels.sort(key=lambda x: x["price_per_night"])
-        elif budget_level == "luxury":
-            filtered_hotels.sort(key=lambda x: x["price_per_night"], reverse=True)
-        # mid-range is already handled by the max_price filter
-
-    return json.dumps(filtered_hotels)
\ No newline at end of file
+    filtered_hotels = within_budget(hotel_options, max_price)
+
+    # Rank by price, rating and amenity match, weighted for the budget level
+    return json.dumps(rank_hotels(filtered_hotels, preferred_amenities, budget_level))
\ No newline at end of file
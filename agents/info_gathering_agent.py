@@ -1,16 +1,13 @@
 from pydantic_ai import Agent
 from pydantic import BaseModel, Field
 from typing import Optional
-import logfire
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import get_model
+from utils import get_agent_model
 
-logfire.configure(send_to_logfire='if-token-present')
-
-model = get_model()
+model = get_agent_model('info_gathering')
 
 class TravelDetails(BaseModel):
     """Details for the current trip."""
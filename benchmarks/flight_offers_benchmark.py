@@ -0,0 +1,144 @@
+"""
+Benchmark for parsing Amadeus flight-offers responses (flight_offers.py).
+
+Builds a response with the API's maximum of 250 offers from the sample offers in
+benchmarks/fixtures (varying prices, carriers and connections), then times and measures:
+  - FlightOffers.from_payload: every offer into columns
+  - shortlist + records: the ranked shortlist search_flights_api returns
+  - building a dict per offer and ranking those with rank_flights, for comparison
+
+Usage: python benchmarks/flight_offers_benchmark.py --offers 250 --repeat 50
+"""
+from typing import Any, Callable, Dict, List
+import statistics
+import tracemalloc
+import argparse
+import random
+import copy
+import json
+import time
+import sys
+import os
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCHMARK_DIR, "fixtures")
+sys.path.append(os.path.dirname(BENCHMARK_DIR))
+
+from flight_offers import FlightOffers, parse_duration
+from ranking import rank_flights
+
+CARRIERS = ["AF", "DL", "BA", "UA", "LH", "KL", "AA", "IB", "LX", "TP"]
+
+
+def make_payload(count: int, rng: random.Random) -> Dict[str, Any]:
+    with open(os.path.join(FIXTURES_DIR, "amadeus_flight_offers.json")) as f:
+        sample = json.load(f)
+
+    offers = []
+    for i in range(count):
+        offer = copy.deepcopy(rng.choice(sample["data"]))
+        offer["id"] = str(i + 1)
+        offer["price"]["total"] = offer["price"]["grandTotal"] = f"{rng.uniform(300, 1800):.2f}"
+        carrier = rng.choice(CARRIERS)
+        for itinerary in offer["itineraries"]:
+            for segment in itinerary["segments"]:
+                segment["carrierCode"] = carrier
+                segment["number"] = str(rng.randint(1, 9999))
+        offers.append(offer)
+    return {"meta": {"count": count}, "data": offers, "dictionaries": sample["dictionaries"]}
+
+
+def per_offer_dicts(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The same fields as FlightOffers.record, built straight from the response as one dict per offer."""
+    records = []
+    for offer in payload.get("data") or []:
+        itineraries = offer.get("itineraries") or []
+        if not itineraries or not itineraries[0].get("segments"):
+            continue
+
+        carriers = []
+        duration = 0.0
+        stops = 0
+        for itinerary in itineraries:
+            segments = itinerary["segments"]
+            duration += parse_duration(itinerary.get("duration"))
+            stops += len(segments) - 1 + sum(segment.get("numberOfStops", 0) for segment in segments)
+            for segment in segments:
+                if segment["carrierCode"] not in carriers:
+                    carriers.append(segment["carrierCode"])
+
+        outbound = itineraries[0]["segments"]
+        record = {
+            "airline": outbound[0]["carrierCode"],
+            "carriers": "/".join(carriers),
+            "flight_number": "+".join(f"{segment['carrierCode']}{segment['number']}" for segment in outbound),
+            "departure_time": outbound[0]["departure"]["at"],
+            "arrival_time": outbound[-1]["arrival"]["at"],
+            "origin": outbound[0]["departure"]["iataCode"],
+            "destination": outbound[-1]["arrival"]["iataCode"],
+            "price": f"{float(offer['price']['total']):.2f} {offer['price'].get('currency', '')}",
+            "duration_minutes": None if duration != duration else int(duration),
+            "stops": stops,
+            "direct": stops == 0,
+        }
+        if len(itineraries) > 1 and itineraries[1].get("segments"):
+            record["return_departure_time"] = itineraries[1]["segments"][0]["departure"]["at"]
+            record["return_arrival_time"] = itineraries[1]["segments"][-1]["arrival"]["at"]
+        records.append(record)
+    return records
+
+
+def time_call(func: Callable[[], Any], repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def allocated(func: Callable[[], Any]) -> int:
+    """Bytes still allocated by the value `func` returns."""
+    tracemalloc.start()
+    value = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del value
+    return size
+
+
+def summarize(label: str, times: List[float]) -> str:
+    return f"{label:<44} {statistics.mean(times) * 1000:>10.3f} {statistics.median(times) * 1000:>10.3f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offers", type=int, default=250, help="offers in the response (Amadeus allows up to 250)")
+    parser.add_argument("--shortlist", type=int, default=10, help="best offers kept, as FLIGHT_SHORTLIST")
+    parser.add_argument("--repeat", type=int, default=50, help="timed repetitions per case")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    payload = make_payload(args.offers, random.Random(args.seed))
+    offers = FlightOffers.from_payload(payload)
+    shortlist = offers.shortlist(args.shortlist)
+
+    # The baseline must describe the offers exactly as FlightOffers does
+    assert per_offer_dicts(payload) == offers.records()
+
+    print(f"offers={len(offers)} shortlist={len(shortlist)} repeat={args.repeat}")
+    print(f"{'case':<44} {'mean ms':>10} {'p50 ms':>10}")
+    print(summarize("parse into columns", time_call(lambda: FlightOffers.from_payload(payload), args.repeat)))
+    print(summarize("parse + shortlist + records", time_call(
+        lambda: (lambda o: o.records(o.shortlist(args.shortlist)))(FlightOffers.from_payload(payload)), args.repeat)))
+    print(summarize("dict per offer + rank_flights", time_call(lambda: rank_flights(per_offer_dicts(payload)), args.repeat)))
+
+    print(f"\n{'memory':<44} {'KiB':>10}")
+    print(f"{'FlightOffers (all offers)':<44} {allocated(lambda: FlightOffers.from_payload(payload)) / 1024:>10.1f}")
+    print(f"{'dict per offer (all offers)':<44} {allocated(lambda: per_offer_dicts(payload)) / 1024:>10.1f}")
+    print(f"{'shortlisted records (cached)':<44} {allocated(lambda: offers.records(shortlist)) / 1024:>10.1f}")
+    print(f"{'raw response payload':<44} {len(json.dumps(payload)) / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
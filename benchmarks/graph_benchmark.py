@@ -0,0 +1,349 @@
+"""
+Offline end-to-end benchmark for the travel agent graph.
+
+Runs `travel_agent_graph` from the first user message to the final plan without any live keys:
+every agent's model is replaced by a pydantic-ai FunctionModel with configurable artificial
+latency, and the flight, hotel and weather APIs in utils.py are served from sample provider
+payloads in benchmarks/fixtures through the shared HTTP session. Model requests still go through
+a rate limiter so scheduling effects show up as rate-limit wait.
+
+Reports per-node wall time, rate-limit wait, tool time and total plan latency over repeated runs.
+
+Usage: python benchmarks/graph_benchmark.py --runs 5 --model-latency 0.5 --provider-latency 0.2
+"""
+from collections import defaultdict
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+import statistics
+import argparse
+import asyncio
+import json
+import time
+import uuid
+import sys
+import os
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCHMARK_DIR, "fixtures")
+sys.path.append(os.path.dirname(BENCHMARK_DIR))
+
+# Keep the benchmark self-contained: fake provider keys, in-memory caches and checkpoints
+os.environ.update({
+    "WEATHER_API_KEY": "benchmark",
+    "FLIGHT_API_KEY": "benchmark",
+    "FLIGHT_API_SECRET": "benchmark",
+    "HOTEL_API_KEY": "benchmark",
+    "RESPONSE_CACHE_PATH": "",
+    "CHECKPOINT_PATH": ":memory:",
+})
+
+from pydantic_ai.models.function import FunctionModel, AgentInfo, DeltaToolCall
+from pydantic_ai.messages import ModelMessage, ModelResponse, ToolCallPart, ToolReturnPart
+import logfire
+
+logfire.configure(send_to_logfire='never')
+
+import agent_graph
+import agents.flight_agent
+import agents.hotel_agent
+import agents.activity_agent
+from http_sessions import session_registry
+from rate_limiter import RateLimiter
+from response_cache import response_cache
+from deadlines import degraded_nodes, deadline_config
+
+TRIP = {
+    "destination": "Paris",
+    "origin": "New York",
+    "date_leaving": "06-15",
+    "date_returning": "06-22",
+    "max_hotel_price": 250,
+    "response": "",
+    "all_details_given": True,
+}
+
+# Structured results the fake recommendation agents return
+FLIGHT_RESULT = {
+    "options": [{"airline": "DL", "outbound": "DL 264 18:30-07:55 direct", "inbound": "DL 265 10:15-12:40 direct",
+                 "price": 812.4, "currency": "USD", "reason": "Preferred airline, direct both ways"}],
+    "notes": "",
+}
+HOTEL_RESULT = {
+    "options": [{"name": "Hotel Le Marais", "price_per_night": 210, "currency": "USD", "rating": 8.6,
+                 "location": "Le Marais", "amenities": ["WiFi", "Gym"], "reason": "Central and within budget"}],
+    "notes": "",
+}
+ACTIVITY_RESULT = {
+    "weather": "Mild and mostly sunny, around 22°C.",
+    "activities": [{"name": "Louvre", "day": "Day 2", "reason": "Indoor, good in any weather"},
+                   {"name": "Seine cruise", "day": "Day 2", "reason": "Best on a sunny evening"}],
+    "notes": "",
+}
+
+NODES = [
+    "gather_info",
+    "get_flight_recommendations",
+    "get_hotel_recommendations",
+    "get_activity_recommendations",
+    "create_final_plan",
+]
+
+
+def load_fixture(name: str) -> Any:
+    with open(os.path.join(FIXTURES_DIR, name)) as f:
+        return json.load(f)
+
+
+class Recorder:
+    """Collects timings for one benchmark run."""
+
+    def __init__(self):
+        self.node_times: Dict[str, float] = defaultdict(float)
+        self.tool_time = 0.0
+        self.provider_calls = 0
+        self.model_requests = 0
+        self.final_prompt_chars = 0
+
+
+class FixtureResponse:
+    def __init__(self, payload: Any, status: int = 200):
+        self.status = status
+        self.payload = payload
+
+    async def json(self):
+        return self.payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FixtureSession:
+    """Stands in for the pooled aiohttp session and replays sample provider responses."""
+
+    closed = False
+
+    def __init__(self, latency: float, recorder: Callable[[], Recorder]):
+        self.latency = latency
+        self.recorder = recorder
+        self.fixtures = {
+            "/v1/security/oauth2/token": load_fixture("amadeus_token.json"),
+            "/v2/shopping/flight-offers": load_fixture("amadeus_flight_offers.json"),
+            "/v1/hotels/locations": load_fixture("booking_hotel_locations.json"),
+            "/v1/hotels/search": load_fixture("booking_hotels_search.json"),
+            "/data/2.5/weather": load_fixture("openweather_current.json"),
+        }
+
+    def _respond(self, url: str, params: Optional[Dict[str, Any]] = None) -> "FixtureContext":
+        # The hotel fixture is a single page of results
+        if (params or {}).get("page_number", 0) > 0:
+            return FixtureContext(self, FixtureResponse({"result": []}))
+        for path, payload in self.fixtures.items():
+            if url.endswith(path):
+                return FixtureContext(self, FixtureResponse(payload))
+        return FixtureContext(self, FixtureResponse({}, status=404))
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> "FixtureContext":
+        return self._respond(url, params)
+
+    def post(self, url: str, **kwargs) -> "FixtureContext":
+        return self._respond(url)
+
+    async def close(self):
+        pass
+
+
+class FixtureContext:
+    def __init__(self, session: FixtureSession, response: FixtureResponse):
+        self.session = session
+        self.response = response
+
+    async def __aenter__(self):
+        self.session.recorder().provider_calls += 1
+        if self.session.latency:
+            await asyncio.sleep(self.session.latency)
+        return self.response
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeModels:
+    """FunctionModels for every agent, gated by a rate limiter and slowed by artificial latency."""
+
+    def __init__(self, limiter: RateLimiter, latency: float, token_latency: float, recorder: Callable[[], Recorder]):
+        self.limiter = limiter
+        self.latency = latency
+        self.token_latency = token_latency
+        self.recorder = recorder
+
+    async def _request(self, messages: List[ModelMessage]) -> int:
+        self.recorder().model_requests += 1
+        prompt_chars = sum(len(str(part.content)) for message in messages for part in message.parts if hasattr(part, "content"))
+        await self.limiter.acquire(prompt_chars / 4)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return prompt_chars
+
+    async def info_gathering(self, messages: List[ModelMessage], info: AgentInfo):
+        await self._request(messages)
+        # Stream the arguments field by field so speculative prefetching can start mid-generation
+        yield {0: DeltaToolCall(name=info.result_tools[0].name)}
+        args = json.dumps(TRIP)
+        for start in range(0, len(args), 16):
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield {0: DeltaToolCall(json_args=args[start:start + 16])}
+
+    def recommendation(self, result: Dict[str, Any]) -> Callable:
+        async def respond(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+            await self._request(messages)
+            tool_returned = any(isinstance(part, ToolReturnPart) for part in messages[-1].parts)
+            # The trip has fixed dates, so the flexible-date search is never needed
+            tools = [t for t in info.function_tools if t.name != "search_flexible_dates"]
+            if tools and not tool_returned:
+                # Flight agents get one round-trip call, like a real model following the prompt
+                tool = next((t for t in tools if t.name == "search_round_trip"), tools[0])
+                return ModelResponse(parts=[ToolCallPart(tool.name, tool_arguments(tool.name))])
+            return ModelResponse(parts=[ToolCallPart(info.result_tools[0].name, result)])
+        return respond
+
+    async def final_plan(self, messages: List[ModelMessage], info: AgentInfo):
+        self.recorder().final_prompt_chars = await self._request(messages)
+        for word in ("Day 1: arrive in Paris and check in. ", "Day 2: Louvre and Seine cruise. ", "Day 3: Montmartre. ") * 4:
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield word
+
+
+def tool_arguments(tool_name: str) -> Dict[str, Any]:
+    if tool_name == "search_round_trip":
+        return {"origin": TRIP["origin"], "destination": TRIP["destination"], "date_leaving": TRIP["date_leaving"], "date_returning": TRIP["date_returning"]}
+    if tool_name == "search_flights":
+        return {"origin": TRIP["origin"], "destination": TRIP["destination"], "date": TRIP["date_leaving"]}
+    if tool_name == "search_hotels":
+        return {"city": TRIP["destination"], "check_in": TRIP["date_leaving"], "check_out": TRIP["date_returning"], "max_price": TRIP["max_hotel_price"]}
+    return {"city": TRIP["destination"], "date": TRIP["date_leaving"]}
+
+
+def timed(func: Callable, record: Callable[[float], None]) -> Callable:
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            record(time.perf_counter() - start)
+    return wrapper
+
+
+def instrument(current: Callable[[], Recorder]):
+    """Wrap the graph nodes and tool helpers with timers before the benchmark graph is built."""
+    for node in NODES:
+        def record_node(elapsed: float, node=node):
+            current().node_times[node] += elapsed
+        setattr(agent_graph, node, timed(getattr(agent_graph, node), record_node))
+
+    def record_tool(elapsed: float):
+        current().tool_time += elapsed
+
+    # Tool helpers are called by the nodes (prefetch mode) and by the agent tools
+    for module, name in (
+        (agent_graph, "find_flights"), (agents.flight_agent, "find_flights"),
+        (agent_graph, "find_hotels"), (agents.hotel_agent, "find_hotels"),
+        (agent_graph, "describe_weather"), (agents.activity_agent, "describe_weather"),
+    ):
+        setattr(module, name, timed(getattr(module, name), record_tool))
+
+
+def summarize(label: str, values: List[float]) -> str:
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+    return f"{label:<32} {statistics.mean(values) * 1000:>10.1f} {statistics.median(values) * 1000:>10.1f} {p95 * 1000:>10.1f}"
+
+
+async def run_benchmark(args: argparse.Namespace):
+    agent_graph.PREFETCH_TOOL_DATA = args.prefetch
+    agent_graph.SPECULATIVE_PREFETCH = args.speculate
+    recorders: List[Recorder] = []
+    current = lambda: recorders[-1]
+
+    instrument(current)
+    graph = agent_graph.build_travel_agent_graph()
+
+    limiter = RateLimiter(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    models = FakeModels(limiter, args.model_latency, args.token_latency, current)
+    session_registry._sessions[asyncio.get_running_loop()] = FixtureSession(args.provider_latency, current)
+
+    agents_ = agent_graph.get_agents()
+    totals, waits = [], []
+    with agents_["info_gathering"].override(model=FunctionModel(stream_function=models.info_gathering)), \
+            agents_["flight"].override(model=FunctionModel(models.recommendation(FLIGHT_RESULT))), \
+            agents_["hotel"].override(model=FunctionModel(models.recommendation(HOTEL_RESULT))), \
+            agents_["activity"].override(model=FunctionModel(models.recommendation(ACTIVITY_RESULT))), \
+            agents_["final_planner"].override(model=FunctionModel(stream_function=models.final_plan)):
+        for _ in range(args.warmup + args.runs):
+            recorders.append(Recorder())
+            if not args.warm_cache:
+                response_cache.clear()
+
+            config = deadline_config(str(uuid.uuid4()), args.deadline)
+            config["configurable"]["planning_mode"] = args.planning_mode
+            initial_state = {
+                "user_input": "I want to go to Paris from New York, June 15th to 22nd. Max hotel budget $250 per night.",
+                "preferred_airlines": ["DL"],
+                "hotel_amenities": ["WiFi", "Gym"],
+                "budget_level": "mid-range",
+                "travel_details": {},
+                "final_plan": "",
+            }
+
+            wait_before = limiter.total_wait
+            start = time.perf_counter()
+            async for _ in graph.astream(initial_state, config, stream_mode="custom"):
+                pass
+            totals.append(time.perf_counter() - start)
+            waits.append(limiter.total_wait - wait_before)
+
+    measured = recorders[args.warmup:]
+    totals, waits = totals[args.warmup:], waits[args.warmup:]
+
+    print(f"runs={args.runs} prefetch={args.prefetch} speculate={args.speculate} model_latency={args.model_latency}s "
+          f"provider_latency={args.provider_latency}s rpm={args.rpm} tpm={args.tpm} deadline={args.deadline or 'none'} "
+          f"planning_mode={args.planning_mode}")
+    print(f"{'stage':<32} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for node in NODES:
+        print(summarize(node, [r.node_times[node] for r in measured]))
+    print(summarize("tool time (sum)", [r.tool_time for r in measured]))
+    print(summarize("rate-limit wait (sum)", waits))
+    print(summarize("total plan latency", totals))
+    print(f"model requests per plan: {statistics.mean(r.model_requests for r in measured):.1f}, "
+          f"provider calls per plan: {statistics.mean(r.provider_calls for r in measured):.1f}, "
+          f"final planner prompt: {statistics.mean(r.final_prompt_chars for r in measured):.0f} chars")
+    degraded = {node: degraded_nodes.value(node=node) for node in NODES if degraded_nodes.value(node=node)}
+    if degraded:
+        print(f"degraded nodes (all runs): {degraded}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="measured runs")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured runs before measuring")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="artificial seconds per model request")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="artificial seconds per streamed model output chunk")
+    parser.add_argument("--provider-latency", type=float, default=0.0, help="artificial seconds per provider HTTP call")
+    parser.add_argument("--rpm", type=float, default=10000, help="requests per minute allowed by the rate limiter")
+    parser.add_argument("--tpm", type=float, default=0, help="tokens per minute allowed by the rate limiter (0 = unlimited)")
+    parser.add_argument("--no-prefetch", dest="prefetch", action="store_false", help="let the agents call their tools instead")
+    parser.add_argument("--no-speculation", dest="speculate", action="store_false", help="wait for gather_info to finish before prefetching")
+    parser.add_argument("--warm-cache", action="store_true", help="keep the response cache between runs")
+    parser.add_argument("--planning-mode", choices=agent_graph.PLANNING_MODES, default="agents",
+                        help="agents, fast (no model call for recommendations) or template (no model call after gather_info)")
+    parser.add_argument("--deadline", type=float, default=0, help="time budget per plan in seconds (0 = none)")
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
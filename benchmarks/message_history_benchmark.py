@@ -0,0 +1,80 @@
+"""
+Micro-benchmark for decoding the info gathering agent's message history.
+
+Compares the per-turn cost of re-decoding every stored row (the old gather_info behavior)
+with the incremental MessageHistoryStore, which only decodes rows appended since the last
+turn. The incremental cost should stay flat as the conversation grows.
+
+Usage: python benchmarks/message_history_benchmark.py [turns]
+"""
+from typing import List
+import tempfile
+import time
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    UserPromptPart,
+    ToolCallPart,
+)
+from message_history import MessageHistoryStore
+
+REPORT_TURNS = (1, 10, 25, 50, 100, 200, 400)
+
+
+def make_turn(i: int) -> List[ModelMessage]:
+    """One clarification turn: the user's message plus a structured response from the agent."""
+    return [
+        ModelRequest(parts=[UserPromptPart(content=f"Turn {i}: I want to fly from New York to Paris, leaving 06-15. " * 3)]),
+        ModelResponse(parts=[
+            TextPart(content="Thanks! Could you tell me your return date and maximum hotel budget? " * 2),
+            ToolCallPart(tool_name="final_result", args={"destination": "Paris", "origin": "New York", "date_leaving": "06-15"}),
+        ]),
+    ]
+
+
+def decode_all(rows: List[bytes]) -> List[ModelMessage]:
+    message_history: List[ModelMessage] = []
+    for message_row in rows:
+        message_history.extend(ModelMessagesTypeAdapter.validate_json(message_row))
+    return message_history
+
+
+def main(turns: int = 400):
+    with tempfile.TemporaryDirectory() as directory:
+        store = MessageHistoryStore(os.path.join(directory, "history.sqlite"))
+        rows: List[bytes] = []
+        count = 0
+
+        print(f"{'turn':>6} {'full decode (ms)':>18} {'incremental (ms)':>18}")
+        for turn in range(1, turns + 1):
+            start = time.perf_counter()
+            decode_all(rows)
+            full = time.perf_counter() - start
+
+            start = time.perf_counter()
+            store.load("bench", count)
+            incremental = time.perf_counter() - start
+
+            messages = make_turn(turn)
+            rows.append(ModelMessagesTypeAdapter.dump_json(messages))
+            count = store.append("bench", count, messages, rows[-1])
+
+            if turn in REPORT_TURNS or turn == turns:
+                print(f"{turn:>6} {full * 1000:>18.3f} {incremental * 1000:>18.3f}")
+
+        # A cold process decodes the history once, then stays incremental
+        cold = MessageHistoryStore(os.path.join(directory, "history.sqlite"))
+        start = time.perf_counter()
+        cold.load("bench", count)
+        print(f"\nCold load of {count} rows after a restart: {(time.perf_counter() - start) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 400)
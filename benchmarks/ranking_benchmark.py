@@ -0,0 +1,147 @@
+"""
+Benchmark for the ranking engine in ranking.py.
+
+Generates random flight and hotel candidates and times:
+  - rank() on prebuilt columns (weighted scores, ordering and the price/quality Pareto frontier)
+  - rank_flights() / rank_hotels() from search-result dicts, including building the columns
+  - a pure-Python implementation of the same scoring and frontier, for comparison
+
+The vectorized and pure-Python results are checked against each other before timing.
+
+Usage: python benchmarks/ranking_benchmark.py --candidates 10000 --repeat 20
+"""
+from typing import Any, Callable, Dict, List, Sequence
+import statistics
+import argparse
+import random
+import time
+import copy
+import sys
+import os
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(BENCHMARK_DIR))
+
+import numpy as np
+
+from ranking import Criterion, FLIGHT_CRITERIA, HOTEL_CRITERIA, rank, rank_flights, rank_hotels
+
+AIRLINES = ["DL", "AF", "UA", "BA", "LH", "KL", "AA", "IB"]
+AMENITIES = ["WiFi", "Pool", "Gym", "Spa", "Parking", "Free Breakfast", "Restaurant", "Concierge"]
+
+
+def make_flights(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [
+        {
+            "airline": rng.choice(AIRLINES),
+            "price": f"{rng.uniform(150, 1500):.2f} EUR",
+            "duration_minutes": rng.randint(420, 1500),
+            "stops": rng.choice([0, 0, 1, 1, 2]),
+        }
+        for _ in range(count)
+    ]
+
+
+def make_hotels(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [
+        {
+            "name": f"Hotel {i}",
+            "price_per_night": round(rng.uniform(60, 600), 2),
+            "rating": round(rng.uniform(5, 10), 1) if rng.random() > 0.05 else "N/A",
+            "amenities": rng.sample(AMENITIES, rng.randint(1, 5)),
+        }
+        for i in range(count)
+    ]
+
+
+def python_rank(columns: Dict[str, List[float]], criteria: Sequence[Criterion]):
+    """The same scoring and frontier as ranking.rank, one candidate at a time."""
+    count = len(next(iter(columns.values())))
+    scores = [0.0] * count
+    quality = [0.0] * count
+    total_weight = quality_weight = 0.0
+    for criterion in criteria:
+        values = columns[criterion.column]
+        known = [v for v in values if v == v]
+        low, high = (min(known), max(known)) if known else (0.0, 0.0)
+        for i, value in enumerate(values):
+            if value != value:
+                scaled = 0.0
+            elif high == low:
+                scaled = 1.0
+            else:
+                scaled = (value - low) / (high - low)
+                if not criterion.higher_is_better:
+                    scaled = 1 - scaled
+            scores[i] += criterion.weight * scaled
+            if criterion.column != "price":
+                quality[i] += criterion.weight * scaled
+        total_weight += criterion.weight
+        if criterion.column != "price":
+            quality_weight += criterion.weight
+    scores = [s / total_weight for s in scores]
+    quality = [q / quality_weight for q in quality]
+
+    price = columns["price"]
+    frontier = [False] * count
+    best = float("-inf")
+    for i in sorted((i for i in range(count) if price[i] == price[i]), key=lambda i: (price[i], -quality[i])):
+        if quality[i] > best:
+            frontier[i] = True
+            best = quality[i]
+    order = sorted(range(count), key=lambda i: -scores[i])
+    return order, scores, frontier
+
+
+def time_call(func: Callable[[], Any], repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summarize(label: str, times: List[float]) -> str:
+    return f"{label:<44} {statistics.mean(times) * 1000:>10.2f} {statistics.median(times) * 1000:>10.2f} {min(times) * 1000:>10.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=10000, help="candidates per search")
+    parser.add_argument("--repeat", type=int, default=20, help="timed repetitions per case")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    flights = make_flights(args.candidates, rng)
+    hotels = make_hotels(args.candidates, rng)
+    hotel_criteria = HOTEL_CRITERIA["mid-range"]
+
+    np_rng = np.random.default_rng(args.seed)
+    columns = {
+        "price": np_rng.uniform(60, 600, args.candidates),
+        "rating": np.where(np_rng.random(args.candidates) > 0.05, np_rng.uniform(5, 10, args.candidates), np.nan),
+        "amenity_match": np_rng.integers(0, 4, args.candidates) / 3,
+    }
+    python_columns = {name: values.tolist() for name, values in columns.items()}
+
+    # Both implementations must agree before their timings mean anything
+    ranking = rank(columns, hotel_criteria)
+    order, scores, frontier = python_rank(python_columns, hotel_criteria)
+    assert np.allclose(ranking.scores, scores)
+    assert ranking.pareto.tolist() == frontier
+    assert np.allclose(ranking.scores[ranking.order], [scores[i] for i in order])
+
+    print(f"candidates={args.candidates} repeat={args.repeat} pareto hotels={int(ranking.pareto.sum())}")
+    print(f"{'case':<44} {'mean ms':>10} {'p50 ms':>10} {'min ms':>10}")
+    print(summarize("rank() on columns (numpy)", time_call(lambda: rank(columns, hotel_criteria), args.repeat)))
+    print(summarize("same scoring in pure Python", time_call(lambda: python_rank(python_columns, hotel_criteria), args.repeat)))
+    print(summarize("rank_hotels() from search results", time_call(
+        lambda: rank_hotels(copy.copy(hotels), ["WiFi", "Gym"], "mid-range"), args.repeat)))
+    print(summarize("rank_flights() from search results", time_call(
+        lambda: rank_flights(copy.copy(flights), ["DL", "AF"]), args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
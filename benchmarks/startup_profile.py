@@ -0,0 +1,101 @@
+"""
+Startup profile for the travel agent.
+
+Imports `agent_graph` in a fresh interpreter under `python -X importtime` and reports where the
+import time goes, by top-level package and by the project's own modules. Then, in another fresh
+interpreter, times the import followed by each step of `prepare_agents()` (graph compilation,
+agents, models), i.e. the work a worker does before it can answer its first message.
+
+Usage: python benchmarks/startup_profile.py --top 15
+"""
+from collections import defaultdict
+from typing import Dict, List, Tuple
+import subprocess
+import argparse
+import json
+import sys
+import os
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCHMARK_DIR)
+
+# Keep the profile self-contained: no cache or checkpoint files, no metrics exporters
+ENV = {
+    **os.environ,
+    "RESPONSE_CACHE_PATH": "",
+    "CHECKPOINT_PATH": ":memory:",
+    "METRICS_PORT": "",
+    "METRICS_DUMP_INTERVAL": "",
+}
+
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import agent_graph
+timings = {"import agent_graph": time.perf_counter() - start}
+timings.update(agent_graph.prepare_agents())
+print(json.dumps(timings))
+"""
+
+
+def project_modules() -> set:
+    names = {name[:-3] for name in os.listdir(PROJECT_DIR) if name.endswith(".py")}
+    return names | {"agents"}
+
+
+def import_times() -> List[Tuple[str, int, int]]:
+    """(module, self microseconds, cumulative microseconds) for every module imported by agent_graph."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import agent_graph"],
+        cwd=PROJECT_DIR, env=ENV, capture_output=True, text=True, check=True
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def startup_steps() -> Dict[str, float]:
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=PROJECT_DIR, env=ENV, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def report(times: List[Tuple[str, int, int]], steps: Dict[str, float], top: int):
+    total = next(cumulative for name, _, cumulative in times if name == "agent_graph")
+    print(f"import agent_graph: {total / 1e6:.3f}s across {len(times)} modules\n")
+
+    by_package: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in times:
+        by_package[name.split(".")[0]] += self_us
+    print(f"{'package (self time)':<40}{'seconds':>10}{'share':>8}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<40}{self_us / 1e6:>10.3f}{self_us / total:>8.0%}")
+
+    own = project_modules()
+    print(f"\n{'project module (cumulative)':<40}{'seconds':>10}{'self':>8}")
+    for name, self_us, cumulative_us in sorted(times, key=lambda item: -item[2]):
+        if name.split(".")[0] in own:
+            print(f"{name:<40}{cumulative_us / 1e6:>10.3f}{self_us / 1e6:>8.3f}")
+
+    print(f"\n{'startup step':<40}{'seconds':>10}")
+    for step, seconds in steps.items():
+        print(f"{step:<40}{seconds:>10.3f}")
+    print(f"{'total':<40}{sum(steps.values()):>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="packages to list by import time")
+    args = parser.parse_args()
+
+    report(import_times(), startup_steps(), args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+import threading
+import sqlite3
+import random
+import time
+import os
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.types import TASKS, ChannelProtocol
+
+load_dotenv()
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "checkpoints.sqlite")
+CHECKPOINT_PATH = os.getenv('CHECKPOINT_PATH') or DEFAULT_CHECKPOINT_PATH
+
+# How many checkpoints to keep per thread when a thread is compacted (0 keeps everything)
+CHECKPOINT_KEEP_LAST = int(os.getenv('CHECKPOINT_KEEP_LAST', '20'))
+# Compact the thread being written every this many checkpoints
+COMPACT_EVERY = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    Durable checkpoint saver backed by a local SQLite file, with no outside service required.
+
+    Channel values are stored once per (channel, version) rather than inside every checkpoint,
+    so a checkpoint only writes the channels that changed in its step. Pending writes are
+    committed as each task finishes, which lets an interrupted run resume and re-run only the
+    nodes whose writes never made it to disk. Old history can be pruned per thread with
+    `compact`, or across all threads with `prune`.
+    """
+
+    def __init__(
+        self,
+        path: str = CHECKPOINT_PATH,
+        *,
+        keep_last: int = CHECKPOINT_KEEP_LAST,
+        serde: Optional[SerializerProtocol] = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.path = path
+        self.keep_last = keep_last
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.puts = 0
+
+    # Reading
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Get the checkpoint for the config's checkpoint_id, or the latest one for the thread."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self.lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                    "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                    "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._load_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints, newest first, matching the given thread, metadata filter and bounds."""
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+            "metadata_type, metadata FROM checkpoints"
+        )
+        clauses: List[str] = []
+        params: List[Any] = []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_checkpoint_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            metadata = self.serde.loads_typed((row[4], row[5]))
+            if filter and not all(metadata.get(key) == value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            with self.lock:
+                checkpoint_tuple = self._load_tuple(thread_id, checkpoint_ns, tuple(row), metadata)
+            yield checkpoint_tuple
+
+    def _load_tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        row: Tuple[Any, ...],
+        metadata: Optional[CheckpointMetadata] = None,
+    ) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint = self.serde.loads_typed((type_, checkpoint_blob))
+
+        # Rebuild the channel values from the versioned blobs this checkpoint points at
+        channel_values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            blob_row = self.conn.execute(
+                "SELECT type, blob FROM checkpoint_blobs "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if blob_row is not None and blob_row[0] != "empty":
+                channel_values[channel] = self.serde.loads_typed(blob_row)
+        checkpoint["channel_values"] = channel_values
+
+        # Sends issued by the parent step are still pending for this checkpoint
+        sends = []
+        if parent_checkpoint_id:
+            sends = [
+                self.serde.loads_typed((type_, value))
+                for type_, value in self.conn.execute(
+                    "SELECT type, value FROM checkpoint_writes "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? AND channel = ? "
+                    "ORDER BY task_path, task_id, idx",
+                    (thread_id, checkpoint_ns, parent_checkpoint_id, TASKS),
+                )
+            ]
+        checkpoint["pending_sends"] = sends
+
+        pending_writes = [
+            (task_id, channel, self.serde.loads_typed((type_, value)))
+            for task_id, channel, type_, value in self.conn.execute(
+                "SELECT task_id, channel, type, value FROM checkpoint_writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+        ]
+
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint,
+            metadata=metadata if metadata is not None else self.serde.loads_typed((metadata_type, metadata_blob)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=pending_writes,
+        )
+
+    # Writing
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Save a checkpoint, writing blobs only for the channels that changed in this step."""
+        c = checkpoint.copy()
+        c.pop("pending_sends", None)  # type: ignore[misc]
+        values = c.pop("channel_values")  # type: ignore[misc]
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+
+        blobs = []
+        for channel, version in new_versions.items():
+            type_, blob = self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)
+            blobs.append((thread_id, checkpoint_ns, channel, str(version), type_, blob))
+
+        type_, checkpoint_blob = self.serde.dumps_typed(c)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoint_blobs "
+                    "(thread_id, checkpoint_ns, channel, version, type, blob) VALUES (?, ?, ?, ?, ?, ?)",
+                    blobs,
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+                    "parent_checkpoint_id, type, checkpoint, metadata_type, metadata, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        config["configurable"].get("checkpoint_id"),  # parent
+                        type_,
+                        checkpoint_blob,
+                        metadata_type,
+                        metadata_blob,
+                        time.time(),
+                    ),
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.puts += 1
+            compact_now = self.keep_last and self.puts % COMPACT_EVERY == 0
+
+        if compact_now:
+            self.compact(thread_id, checkpoint_ns)
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Commit the writes of a finished task so they survive a crash later in the same step."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        # Regular writes are idempotent, special ones (errors, interrupts, resumes) replace earlier ones
+        regular, special = [], []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            row = (thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx, channel, type_, blob, task_path)
+            (regular if write_idx >= 0 else special).append(row)
+
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                for verb, rows in (("INSERT OR IGNORE", regular), ("INSERT OR REPLACE", special)):
+                    self.conn.executemany(
+                        f"{verb} INTO checkpoint_writes (thread_id, checkpoint_ns, checkpoint_id, task_id, "
+                        "idx, channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    # Async versions - SQLite calls on a local file are quick, so they run inline like MemorySaver
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    def get_next_version(self, current: Optional[str], channel: ChannelProtocol) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        next_v = current_v + 1
+        next_h = random.random()
+        return f"{next_v:032}.{next_h:016}"
+
+    # Maintenance
+
+    def compact(self, thread_id: str, checkpoint_ns: str = "", keep_last: Optional[int] = None) -> int:
+        """
+        Drop all but the newest `keep_last` checkpoints of a thread, along with the writes and
+        channel blobs nothing points at any more. Returns the number of checkpoints removed.
+        """
+        keep_last = self.keep_last if keep_last is None else keep_last
+        if keep_last <= 0:
+            return 0
+
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC",
+                (thread_id, checkpoint_ns),
+            ).fetchall()
+            if len(rows) <= keep_last:
+                return 0
+
+            kept = rows[:keep_last]
+            removed = [row[0] for row in rows[keep_last:]]
+            # Writes of a kept checkpoint's parent still carry its pending sends
+            keep_writes = {row[0] for row in kept} | {row[1] for row in kept if row[1]}
+            live_blobs = set()
+            for _, _, type_, blob in kept:
+                for channel, version in self.serde.loads_typed((type_, blob))["channel_versions"].items():
+                    live_blobs.add((channel, str(version)))
+
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    [(thread_id, checkpoint_ns, checkpoint_id) for checkpoint_id in removed],
+                )
+                self.conn.executemany(
+                    "DELETE FROM checkpoint_writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    [(thread_id, checkpoint_ns, checkpoint_id) for checkpoint_id in removed if checkpoint_id not in keep_writes],
+                )
+                stale_blobs = [
+                    (thread_id, checkpoint_ns, channel, version)
+                    for channel, version in self.conn.execute(
+                        "SELECT channel, version FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ?",
+                        (thread_id, checkpoint_ns),
+                    ).fetchall()
+                    if (channel, version) not in live_blobs
+                ]
+                self.conn.executemany(
+                    "DELETE FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                    stale_blobs,
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            return len(removed)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Remove every checkpoint, write and blob of a thread, plus any other per-thread rows in the file."""
+        with self.lock:
+            tables = [
+                name for (name,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+                if any(column[1] == "thread_id" for column in self.conn.execute(f"PRAGMA table_info({name})"))
+            ]
+            self.conn.execute("BEGIN")
+            try:
+                for table in tables:
+                    self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def prune(self, max_age_seconds: Optional[float] = None, keep_last: Optional[int] = None) -> Dict[str, int]:
+        """
+        Prune history across all threads: delete threads idle for longer than `max_age_seconds`,
+        compact the rest down to `keep_last` checkpoints, and reclaim the freed file space.
+        """
+        with self.lock:
+            threads = self.conn.execute(
+                "SELECT thread_id, checkpoint_ns, MAX(created_at) FROM checkpoints GROUP BY thread_id, checkpoint_ns"
+            ).fetchall()
+
+        deleted_threads = 0
+        removed_checkpoints = 0
+        cutoff = time.time() - max_age_seconds if max_age_seconds is not None else None
+        for thread_id, checkpoint_ns, last_updated in threads:
+            if cutoff is not None and last_updated < cutoff:
+                self.delete_thread(thread_id)
+                deleted_threads += 1
+            else:
+                removed_checkpoints += self.compact(thread_id, checkpoint_ns, keep_last)
+
+        with self.lock:
+            self.conn.execute("VACUUM")
+        return {"deleted_threads": deleted_threads, "removed_checkpoints": removed_checkpoints}
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,64 @@
+from typing import Any, Callable, Dict, Optional
+from functools import wraps
+from dotenv import load_dotenv
+import asyncio
+import inspect
+import time
+import os
+
+from langgraph.config import get_config
+
+from metrics import registry
+
+load_dotenv()
+
+# Time budget for one graph run, from the user's message to the last token of the plan
+PLAN_DEADLINE_SECONDS = float(os.getenv('PLAN_DEADLINE_SECONDS', '90'))
+
+degraded_nodes = registry.counter("travel_node_degraded_total", "Graph nodes that ran out of budget and returned a degraded result")
+
+
+def deadline_config(thread_id: str, budget: Optional[float] = None) -> Dict[str, Any]:
+    """Build a run config whose deadline is `budget` seconds (default PLAN_DEADLINE_SECONDS) from now."""
+    budget = PLAN_DEADLINE_SECONDS if budget is None else budget
+    configurable: Dict[str, Any] = {"thread_id": thread_id}
+    if budget > 0:
+        configurable["deadline"] = time.time() + budget
+    return {"configurable": configurable}
+
+
+def remaining_budget(config: Optional[Dict[str, Any]] = None) -> Optional[float]:
+    """Seconds left before the run's deadline, or None when the run has no deadline."""
+    if config is None:
+        try:
+            config = get_config()
+        except RuntimeError:
+            return None
+    deadline = (config.get("configurable") or {}).get("deadline")
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.time())
+
+
+def with_budget(name: str, func: Callable, share: float, fallback: Callable) -> Callable:
+    """
+    Run an async graph node within `share` of the run's remaining budget.
+
+    If the node doesn't finish in time it is cancelled and `fallback(state)` provides a degraded
+    result instead, so the nodes downstream still run before the deadline.
+    """
+
+    @wraps(func)
+    async def wrapper(state, *args, **kwargs):
+        remaining = remaining_budget()
+        if remaining is None:
+            return await func(state, *args, **kwargs)
+
+        try:
+            return await asyncio.wait_for(func(state, *args, **kwargs), timeout=remaining * share)
+        except asyncio.TimeoutError:
+            degraded_nodes.inc(node=name)
+            result = fallback(state)
+            return await result if inspect.isawaitable(result) else result
+
+    return wrapper
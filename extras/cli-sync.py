@@ -1,11 +1,12 @@
 from dotenv import load_dotenv
+from dataclasses import replace
 from typing import List
 import asyncio
 import logfire
 import sys
 import os
 
-from pydantic_ai.messages import ModelMessage, ModelRequest, ModelResponse, TextPart, UserPromptPart
+from pydantic_ai.messages import ModelMessage, ModelRequest, ModelResponse, UserPromptPart
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from agents.flight_agent import flight_agent, FlightDeps
@@ -44,21 +45,25 @@ class CLI:
                 ModelRequest(parts=[UserPromptPart(content=user_input)])
             )
 
-            # Store itermediatry messages like tool calls and responses
-            filtered_messages = [msg for msg in result.new_messages() 
-                            if not (hasattr(msg, 'parts') and 
-                                    any(part.part_kind == 'user-prompt' or part.part_kind == 'text' for part in msg.parts))]
+            # Store itermediatry messages like tool calls and responses, including the final-result
+            # tool call and its return. Text parts are stripped rather than dropping their response,
+            # which would leave a tool return without its call.
+            filtered_messages = []
+            for msg in result.new_messages():
+                if isinstance(msg, ModelRequest) and any(part.part_kind == 'user-prompt' for part in msg.parts):
+                    continue
+                if isinstance(msg, ModelResponse):
+                    parts = [part for part in msg.parts if part.part_kind != 'text']
+                    if not parts:
+                        continue
+                    msg = replace(msg, parts=parts)
+                filtered_messages.append(msg)
             self.messages.extend(filtered_messages)
 
             # Optional if you want to print out tool calls and responses
             # print(filtered_messages + "\n\n")
 
-            print(result.data)
-
-            # Add the final response from the agent
-            self.messages.append(
-                ModelResponse(parts=[TextPart(content=result.data)])
-            )
+            print(result.data.compact())
 
 async def main():
     cli = CLI()
@@ -56,6 +56,9 @@ class CLI:
                                             ai_response += event.delta.content_delta
                                             live.update(Markdown(ai_response))                       
 
+                # The agent answers with structured recommendations rather than text
+                live.update(Markdown(run.result.data.compact()))
+
             # Store the user message, tool calls and results, and the AI response
             self.messages += run.result.all_messages()
 
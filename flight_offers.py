@@ -0,0 +1,143 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+import re
+
+import numpy as np
+
+from ranking import FLIGHT_CRITERIA, rank
+
+# ISO 8601 durations as used by Amadeus, e.g. "PT7H15M" or "P1DT2H"
+_ISO_DURATION = re.compile(r'P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?$')
+
+
+@lru_cache(maxsize=4096)
+def parse_duration(value: Optional[str]) -> float:
+    """Minutes in an ISO 8601 duration, or NaN if it can't be read."""
+    match = _ISO_DURATION.match(value or "")
+    if not match or not any(match.groups()):
+        return np.nan
+    days, hours, minutes = (int(part or 0) for part in match.groups())
+    return float(days * 1440 + hours * 60 + minutes)
+
+
+class FlightOffers:
+    """
+    The offers of one Amadeus flight-offers response, stored column by column.
+
+    Price, total duration (minutes, all itineraries) and stops are NumPy arrays, so hundreds of
+    offers can be ranked without a dict per offer; the text columns are tuples of (mostly
+    interned) strings. Times, airports and flight numbers describe the outbound itinerary, with
+    the return itinerary's times kept for round-trip offers.
+    """
+
+    __slots__ = (
+        "price", "duration", "stops", "currency", "airline", "carriers", "flight_number",
+        "origin", "destination", "departure", "arrival", "return_departure", "return_arrival",
+    )
+
+    def __init__(self, price: np.ndarray, duration: np.ndarray, stops: np.ndarray, **text_columns: Sequence[Any]):
+        self.price = price
+        self.duration = duration
+        self.stops = stops
+        for name in self.__slots__[3:]:
+            setattr(self, name, tuple(text_columns[name]))
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "FlightOffers":
+        """Parse every offer in a flight-offers response (up to the API's 250)."""
+        offers = payload.get("data") or []
+        count = len(offers)
+        price = np.full(count, np.nan)
+        duration = np.full(count, np.nan)
+        stops = np.zeros(count, dtype=np.int16)
+        text = {name: [None] * count for name in cls.__slots__[3:]}
+
+        for i, offer in enumerate(offers):
+            itineraries = offer.get("itineraries") or []
+            if not itineraries or not itineraries[0].get("segments"):
+                continue
+
+            try:
+                price[i] = float(offer["price"]["total"])
+            except (KeyError, TypeError, ValueError):
+                pass
+            text["currency"][i] = (offer.get("price") or {}).get("currency", "")
+
+            carriers = []
+            total_minutes = 0.0
+            for itinerary in itineraries:
+                segments = itinerary["segments"]
+                total_minutes += parse_duration(itinerary.get("duration"))
+                # Connections plus technical stops within a segment
+                stops[i] += len(segments) - 1 + sum(segment.get("numberOfStops", 0) for segment in segments)
+                for segment in segments:
+                    if segment["carrierCode"] not in carriers:
+                        carriers.append(segment["carrierCode"])
+            duration[i] = total_minutes
+
+            outbound = itineraries[0]["segments"]
+            text["airline"][i] = outbound[0]["carrierCode"]
+            text["carriers"][i] = "/".join(carriers)
+            text["flight_number"][i] = "+".join(f"{segment['carrierCode']}{segment['number']}" for segment in outbound)
+            text["origin"][i] = outbound[0]["departure"]["iataCode"]
+            text["destination"][i] = outbound[-1]["arrival"]["iataCode"]
+            text["departure"][i] = outbound[0]["departure"]["at"]
+            text["arrival"][i] = outbound[-1]["arrival"]["at"]
+            if len(itineraries) > 1 and itineraries[1].get("segments"):
+                inbound = itineraries[1]["segments"]
+                text["return_departure"][i] = inbound[0]["departure"]["at"]
+                text["return_arrival"][i] = inbound[-1]["arrival"]["at"]
+
+        # Drop offers without a usable itinerary
+        valid = np.array([airline is not None for airline in text["airline"]], dtype=bool)
+        if not valid.all():
+            keep = np.flatnonzero(valid)
+            text = {name: [values[i] for i in keep] for name, values in text.items()}
+            price, duration, stops = price[keep], duration[keep], stops[keep]
+        return cls(price, duration, stops, **text)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """The numeric columns, as ranking.rank expects them."""
+        return {"price": self.price, "duration": self.duration, "stops": self.stops}
+
+    def shortlist(self, limit: int) -> List[int]:
+        """
+        Indices of the offers worth keeping, best first: the `limit` best by price, duration and
+        stops, every Pareto-optimal one, and the cheapest of each airline (so airline preferences
+        can still be applied to the shortlist later).
+        """
+        ranking = rank(self.columns(), FLIGHT_CRITERIA)
+        keep = set(ranking.order[:limit].tolist()) | set(np.flatnonzero(ranking.pareto).tolist())
+
+        airlines = set()
+        for i in np.argsort(self.price, kind="stable").tolist():
+            if self.airline[i] not in airlines:
+                airlines.add(self.airline[i])
+                keep.add(i)
+        return [i for i in ranking.order.tolist() if i in keep]
+
+    def record(self, i: int) -> Dict[str, Any]:
+        """One offer in the dict form the flight tools work with."""
+        record = {
+            "airline": self.airline[i],
+            "carriers": self.carriers[i],
+            "flight_number": self.flight_number[i],
+            "departure_time": self.departure[i],
+            "arrival_time": self.arrival[i],
+            "origin": self.origin[i],
+            "destination": self.destination[i],
+            "price": f"{self.price[i]:.2f} {self.currency[i]}",
+            "duration_minutes": None if np.isnan(self.duration[i]) else int(self.duration[i]),
+            "stops": int(self.stops[i]),
+            "direct": bool(self.stops[i] == 0),
+        }
+        if self.return_departure[i]:
+            record["return_departure_time"] = self.return_departure[i]
+            record["return_arrival_time"] = self.return_arrival[i]
+        return record
+
+    def records(self, indices: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        return [self.record(i) for i in (range(len(self)) if indices is None else indices)]
@@ -0,0 +1,149 @@
+import weakref
+import asyncio
+import os
+
+import aiohttp
+import httpx
+
+# Connection pool tuning for the external travel APIs
+MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', '100'))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', '20'))
+KEEPALIVE_TIMEOUT = 60  # seconds an idle connection is kept open for reuse
+DNS_CACHE_TTL = 300  # seconds a resolved hostname is cached
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
+
+# Connection pool tuning for the LLM endpoint
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '20'))
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv('LLM_KEEPALIVE_CONNECTIONS', '10'))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv('LLM_KEEPALIVE_EXPIRY', '120'))
+# HTTP/2 multiplexes the graph's concurrent model calls over one connection; it needs the optional
+# h2 package and falls back to HTTP/1.1 keep-alive without it (or with servers that don't offer it)
+LLM_HTTP2 = os.getenv('LLM_HTTP2', 'true').lower() in ('1', 'true', 'yes')
+
+
+class SessionRegistry:
+    """
+    Long-lived, pooled aiohttp sessions shared by every provider call in the process.
+
+    aiohttp sessions are bound to the event loop they were created on, and Streamlit runs each
+    script run on its own loop, so one session is kept per running loop. Within a loop every
+    caller reuses the same warm, keep-alive connections instead of paying for a new TCP+TLS
+    handshake and DNS lookup on each tool call.
+    """
+
+    def __init__(self):
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=MAX_CONNECTIONS,
+            limit_per_host=MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            use_dns_cache=True,
+            ttl_dns_cache=DNS_CACHE_TTL
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=REQUEST_TIMEOUT)
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Get the shared session for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = self._create_session()
+            self._sessions[loop] = session
+        return session
+
+    async def start(self) -> aiohttp.ClientSession:
+        """Startup hook: open the session for the running loop ahead of the first request."""
+        return self.get_session()
+
+    async def close(self):
+        """Shutdown hook: close the session that belongs to the running loop."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+
+# The single registry shared by all provider functions and the graph
+session_registry = SessionRegistry()
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class LoopLocalTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that keeps one pooled connection transport per running event loop.
+
+    httpx connections can't be shared between event loops, so like SessionRegistry this keeps a
+    pool per loop: one shared client can then serve every Streamlit session, while the concurrent
+    calls within a graph run reuse the same warm keep-alive (or HTTP/2) connections.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_keepalive_connections: int = LLM_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY,
+        http2: bool = LLM_HTTP2
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2 and http2_available()
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = weakref.WeakKeyDictionary()
+
+    def get_transport(self) -> httpx.AsyncHTTPTransport:
+        """Get the transport for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)
+            self._transports[loop] = transport
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.get_transport().handle_async_request(request)
+
+    async def warm(self, url: str, timeout: float = 10.0):
+        """Open a connection to `url`'s host ahead of the first request (any response will do)."""
+        request = httpx.Request("HEAD", url, extensions={"timeout": httpx.Timeout(timeout).as_dict()})
+        try:
+            response = await self.handle_async_request(request)
+            await response.aclose()
+        except httpx.HTTPError:
+            pass
+
+    async def aclose(self):
+        """Close the connections that belong to the running loop."""
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+# The single pool of LLM connections shared by every model client in the process
+llm_transport = LoopLocalTransport()
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Get the pooled HTTP session for the running event loop."""
+    return session_registry.get_session()
+
+
+async def start_http_sessions():
+    """Open pooled HTTP sessions before serving requests."""
+    await session_registry.start()
+
+
+async def close_http_sessions():
+    """Close pooled HTTP sessions on shutdown."""
+    await session_registry.close()
+    await llm_transport.aclose()
@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import unicodedata
+import csv
+import os
+
+# Bundled airport and metropolitan-area codes, most popular destinations first
+LOCATIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "airports.csv")
+
+# How many completions every trie node keeps, already ranked
+MAX_COMPLETIONS = 10
+
+
+@dataclass(frozen=True)
+class Location:
+    code: str
+    kind: str  # "city" for a metropolitan area code covering several airports, otherwise "airport"
+    name: str
+    city: str
+    country: str
+    rank: int
+    aliases: Tuple[str, ...] = ()
+
+    @property
+    def label(self) -> str:
+        return f"{self.name} ({self.code}), {self.country}"
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop accents and punctuation, and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c if c.isalnum() else " " for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+
+def is_iata_code(text: str) -> bool:
+    """True for three ASCII letters like "PDX" or "sfo"."""
+    text = text.strip()
+    return len(text) == 3 and text.isascii() and text.isalpha()
+
+
+class LocationIndex:
+    """
+    In-memory index of airports and cities for IATA code resolution and autocomplete.
+
+    Exact names and aliases resolve through a dict; prefixes go through a character trie whose
+    nodes each keep their best-ranked completions, so both are a handful of dict lookups with
+    no network round trip. Codes are in the trie for autocomplete, but only resolve when typed
+    as a code, so a short name like "Goa" isn't taken for Genoa's GOA.
+    """
+
+    def __init__(self, locations: List[Location]):
+        self.locations = locations
+        self.by_code: Dict[str, Location] = {location.code: location for location in locations}
+        self.aliases: Dict[str, Location] = {}
+        self.trie: Dict = {}
+
+        for location in locations:
+            # Airports of a city with its own metropolitan code still resolve the city to that code
+            for term in (location.city, location.name):
+                self._add_alias(term, location)
+            self._add_completion(normalize(location.code), location)
+            for term in location.aliases:
+                self._add_alias(term, location)
+
+    @classmethod
+    def load(cls, path: str = LOCATIONS_PATH) -> "LocationIndex":
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        return cls([
+            Location(
+                row["code"], row["kind"], row["name"], row["city"], row["country"], rank,
+                tuple(alias for alias in (row.get("aliases") or "").split(";") if alias)
+            )
+            for rank, row in enumerate(rows)
+        ])
+
+    def _add_alias(self, term: str, location: Location):
+        key = normalize(term)
+        if not key:
+            return
+
+        # City codes win over airports, then the more popular (earlier) entry
+        current = self.aliases.get(key)
+        if current is None or (location.kind == "city" and current.kind != "city"):
+            self.aliases[key] = location
+        self._add_completion(key, location)
+
+    def _add_completion(self, key: str, location: Location):
+        node = self.trie
+        for char in key:
+            node = node.setdefault(char, {})
+            completions = node.setdefault("", [])
+            if location not in completions:
+                completions.append(location)
+                completions.sort(key=lambda l: l.rank)
+                del completions[MAX_COMPLETIONS:]
+
+    def resolve(self, text: Optional[str]) -> Optional[str]:
+        """
+        Resolve a city, airport name, alias or code to an IATA code, or None if it is unknown.
+
+        Three capital letters are taken as a code, even one the bundled dataset doesn't cover, since
+        it only has the most popular airports. Anything else is matched against names and aliases.
+        """
+        if not text:
+            return None
+        if is_iata_code(text) and text.strip().isupper():
+            return text.strip()
+        key = normalize(text)
+
+        location = self.aliases.get(key)
+        if location is None and "," in text:
+            # "Paris, France" or "Sydney, NSW"
+            location = self.aliases.get(normalize(text.split(",")[0]))
+        if location is None and len(key) >= 3:
+            # Fall back to the best completion of a partial name like "Los Angel", skipping code matches
+            location = next((
+                completion for completion in self.complete(text)
+                if any(normalize(term).startswith(key) for term in (completion.city, completion.name, *completion.aliases))
+            ), None)
+        return location.code if location else None
+
+    def complete(self, prefix: str, limit: int = MAX_COMPLETIONS) -> List[Location]:
+        """Best-ranked locations with a name, city, alias or code starting with `prefix`."""
+        node = self.trie
+        for char in normalize(prefix):
+            node = node.get(char)
+            if node is None:
+                return []
+        return node.get("", [])[:limit]
+
+    def countries(self) -> List[str]:
+        return sorted({location.country for location in self.locations})
+
+    def cities_by_country(self) -> Dict[str, List[str]]:
+        """Cities per country in popularity order."""
+        cities: Dict[str, List[str]] = {}
+        for location in self.locations:
+            country_cities = cities.setdefault(location.country, [])
+            if location.city not in country_cities:
+                country_cities.append(location.city)
+        return cities
+
+
+# Built once per process from the bundled dataset
+location_index = LocationIndex.load()
+
+
+def resolve_iata(text: Optional[str]) -> Optional[str]:
+    """Resolve free text like "New York" or "Paris, France" to an IATA city or airport code."""
+    return location_index.resolve(text)
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import threading
+import sqlite3
+import os
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
+
+from checkpointer import CHECKPOINT_PATH
+
+# How many threads keep their decoded history in memory
+MAX_CACHED_THREADS = int(os.getenv('MESSAGE_HISTORY_CACHED_THREADS', '256'))
+
+
+class MessageHistoryStore:
+    """
+    Append-only, per-thread store for the info gathering agent's message history.
+
+    Each turn's new messages are stored once as a JSON row, and the graph state only keeps the
+    number of rows that belong to the thread. That keeps the transcript out of every checkpoint,
+    and a checkpoint rewound to an earlier turn still sees exactly the rows it had. Decoded
+    messages are cached per thread, so a turn only decodes rows appended since the last one.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_PATH, max_cached_threads: int = MAX_CACHED_THREADS):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS message_rows ("
+            "thread_id TEXT NOT NULL, seq INTEGER NOT NULL, messages BLOB NOT NULL, "
+            "PRIMARY KEY (thread_id, seq))"
+        )
+        self.lock = threading.Lock()
+        self.max_cached_threads = max_cached_threads
+        # thread_id -> (messages, row_ends) where row_ends[i] is len(messages) after row i
+        self._decoded: "OrderedDict[str, Tuple[List[ModelMessage], List[int]]]" = OrderedDict()
+        self.rows_decoded = 0
+
+    def load(self, thread_id: str, row_count: int) -> List[ModelMessage]:
+        """Get the first `row_count` rows of a thread's history, decoding only rows not seen before."""
+        with self.lock:
+            messages, row_ends = self._cached(thread_id)
+
+            if len(row_ends) > row_count:
+                # The state was rewound to an earlier checkpoint
+                del messages[row_ends[row_count - 1] if row_count else 0:]
+                del row_ends[row_count:]
+            elif len(row_ends) < row_count:
+                rows = self.conn.execute(
+                    "SELECT messages FROM message_rows WHERE thread_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                    (thread_id, len(row_ends), row_count),
+                ).fetchall()
+                for (row,) in rows:
+                    messages.extend(ModelMessagesTypeAdapter.validate_json(row))
+                    row_ends.append(len(messages))
+                    self.rows_decoded += 1
+
+            return list(messages)
+
+    def append(self, thread_id: str, row_count: int, new_messages: List[ModelMessage], new_messages_json: Optional[bytes] = None) -> int:
+        """Store one turn's messages after the first `row_count` rows and return the new row count."""
+        if new_messages_json is None:
+            new_messages_json = ModelMessagesTypeAdapter.dump_json(new_messages)
+
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                # Anything past this point belongs to a branch that was rewound away
+                self.conn.execute(
+                    "DELETE FROM message_rows WHERE thread_id = ? AND seq >= ?", (thread_id, row_count)
+                )
+                self.conn.execute(
+                    "INSERT INTO message_rows (thread_id, seq, messages) VALUES (?, ?, ?)",
+                    (thread_id, row_count, new_messages_json),
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+            # The caller already has the decoded messages, so there is nothing to parse
+            messages, row_ends = self._cached(thread_id)
+            if len(row_ends) == row_count:
+                messages.extend(new_messages)
+                row_ends.append(len(messages))
+            else:
+                self._decoded.pop(thread_id, None)
+
+        return row_count + 1
+
+    def delete_thread(self, thread_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM message_rows WHERE thread_id = ?", (thread_id,))
+            self._decoded.pop(thread_id, None)
+
+    def _cached(self, thread_id: str) -> Tuple[List[ModelMessage], List[int]]:
+        entry = self._decoded.get(thread_id)
+        if entry is None:
+            entry = ([], [])
+            self._decoded[thread_id] = entry
+            while len(self._decoded) > self.max_cached_threads:
+                self._decoded.popitem(last=False)
+        else:
+            self._decoded.move_to_end(thread_id)
+        return entry
+
+
+# The history store shared by every conversation in the process
+message_history_store = MessageHistoryStore()
@@ -0,0 +1,288 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+from functools import wraps
+from dotenv import load_dotenv
+import threading
+import inspect
+import time
+import sys
+import os
+
+load_dotenv()
+
+# Each series keeps this many recent observations for its quantiles
+WINDOW_SIZE = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Summary:
+    """Latency distribution with p50/p95/p99 over a sliding window of recent observations."""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._windows: Dict[LabelKey, Deque[float]] = defaultdict(lambda: deque(maxlen=WINDOW_SIZE))
+        self._sums: Dict[LabelKey, float] = defaultdict(float)
+        self._counts: Dict[LabelKey, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._windows[key].append(value)
+            self._sums[key] += value
+            self._counts[key] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            return self._counts.get(_label_key(labels), 0)
+
+    def quantiles(self, **labels) -> Dict[float, float]:
+        with self._lock:
+            values = sorted(self._windows.get(_label_key(labels), ()))
+        return {q: _quantile(values, q) for q in QUANTILES} if values else {}
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} summary"
+        with self._lock:
+            series = [(key, sorted(window), self._sums[key], self._counts[key]) for key, window in self._windows.items()]
+        for key, values, total, count in series:
+            for q in QUANTILES:
+                yield f"{self.name}{_format_labels(key, ('quantile', str(q)))} {_quantile(values, q)}"
+            yield f"{self.name}_sum{_format_labels(key)} {total}"
+            yield f"{self.name}_count{_format_labels(key)} {count}"
+
+
+class Counter:
+    """Monotonically increasing count, e.g. errors or tokens used."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] += amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+
+class Gauge(Counter):
+    """A value that goes up and down, e.g. calls currently in flight."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+def _quantile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help)
+            return self._metrics[name]
+
+    def summary(self, name: str, help: str) -> Summary:
+        return self._get(Summary, name, help)
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Graph nodes
+node_seconds = registry.summary("travel_node_seconds", "Wall time of each graph node")
+node_in_flight = registry.gauge("travel_node_in_flight", "Graph nodes currently running")
+node_errors = registry.counter("travel_node_errors_total", "Graph nodes that raised an exception")
+
+# Agent tools
+tool_seconds = registry.summary("travel_tool_seconds", "Wall time of each agent tool")
+tool_in_flight = registry.gauge("travel_tool_in_flight", "Agent tools currently running")
+tool_errors = registry.counter("travel_tool_errors_total", "Agent tools that raised an exception")
+
+# LLM requests
+llm_request_seconds = registry.summary("travel_llm_request_seconds", "Time from sending an LLM request to its response headers")
+llm_rate_limit_wait_seconds = registry.summary("travel_llm_rate_limit_wait_seconds", "Time LLM requests waited on the shared rate limiter")
+llm_requests = registry.counter("travel_llm_requests_total", "LLM requests by HTTP status")
+llm_tokens = registry.counter("travel_llm_tokens_total", "Tokens used per agent and direction")
+
+# Structured output validation
+validation_seconds = registry.summary("travel_validation_seconds", "Time spent validating structured agent output")
+
+
+@contextmanager
+def track(summary: Summary, in_flight: Gauge, errors: Counter, **labels):
+    """Time a block, counting it as in flight while it runs and as an error if it raises."""
+    in_flight.inc(**labels)
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        errors.inc(error=type(e).__name__, **labels)
+        raise
+    finally:
+        summary.observe(time.perf_counter() - start, **labels)
+        in_flight.dec(**labels)
+
+
+def instrument_node(name: str, func: Callable) -> Callable:
+    """Wrap a graph node so its latency, concurrency and errors are recorded."""
+    if not inspect.iscoroutinefunction(func):
+        @wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            with track(node_seconds, node_in_flight, node_errors, node=name):
+                return func(*args, **kwargs)
+
+        return sync_wrapper
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        with track(node_seconds, node_in_flight, node_errors, node=name):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def instrument_tool(name: str) -> Callable:
+    """Decorator recording the latency, concurrency and errors of an async agent tool."""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with track(tool_seconds, tool_in_flight, tool_errors, tool=name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_usage(agent: str, usage: Any):
+    """Record the token usage of an agent run (a pydantic-ai Usage)."""
+    llm_tokens.inc(usage.request_tokens or 0, agent=agent, direction="request")
+    llm_tokens.inc(usage.response_tokens or 0, agent=agent, direction="response")
+
+
+# Exporters
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve the metrics in Prometheus text format at http://host:port/metrics."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def start_metrics_dump(interval: float, path: Optional[str] = None) -> threading.Thread:
+    """Write the metrics to `path` (or stderr) every `interval` seconds."""
+
+    def dump():
+        while True:
+            time.sleep(interval)
+            text = registry.render()
+            if path:
+                with open(path, "w") as f:
+                    f.write(text)
+            else:
+                sys.stderr.write(text)
+
+    thread = threading.Thread(target=dump, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_metrics_exporters():
+    """Start the exporters configured through METRICS_PORT / METRICS_DUMP_INTERVAL, once per process."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    if port := os.getenv('METRICS_PORT'):
+        try:
+            start_metrics_server(int(port), os.getenv('METRICS_HOST', '127.0.0.1'))
+        except OSError as e:
+            # Another worker in this machine may already serve the port
+            print(f"Metrics server not started: {e}")
+    if interval := os.getenv('METRICS_DUMP_INTERVAL'):
+        start_metrics_dump(float(interval), os.getenv('METRICS_DUMP_PATH') or None)
@@ -0,0 +1,227 @@
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from functools import lru_cache
+import threading
+import asyncio
+import random
+import time
+
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.usage import Usage
+import httpx
+
+from metrics import registry
+
+# Weight of the newest observation in the moving averages
+EWMA_ALPHA = 0.2
+# Consecutive failures after which a model is skipped, and for how long
+FAILURES_BEFORE_COOLDOWN = 3
+COOLDOWN_SECONDS = 30.0
+# Share of calls sent to a random healthy model so the others' latency stays up to date
+EXPLORE_PROBABILITY = 0.05
+
+
+@lru_cache(maxsize=None)
+def fallback_errors() -> Tuple[type, ...]:
+    """Errors that mean the model or its provider failed, so another model should be tried."""
+    # openai is imported on first use; it is one of the slowest imports at startup
+    import openai
+
+    return (ModelHTTPError, openai.APIError, httpx.HTTPError, asyncio.TimeoutError)
+
+
+model_latency = registry.summary("travel_model_latency_seconds", "Time to a model's response (or first streamed chunk) per agent")
+model_calls = registry.counter("travel_model_calls_total", "Model calls per agent, model and outcome")
+
+
+@dataclass
+class ModelStats:
+    """Moving averages of one model's latency and error rate for one agent."""
+
+    latency: Optional[float] = None
+    error_rate: float = 0.0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def score(self) -> float:
+        # Untried models score best, so each option gets measured once
+        if self.latency is None:
+            return 0.0
+        return self.latency * (1 + 4 * self.error_rate)
+
+
+class ModelRouter:
+    """Tracks latency and errors per model for one agent and orders the models to try."""
+
+    def __init__(self, agent: str, names: List[str], explore_probability: float = EXPLORE_PROBABILITY):
+        self.agent = agent
+        self.stats: Dict[str, ModelStats] = {name: ModelStats() for name in names}
+        self.explore_probability = explore_probability
+        self._lock = threading.Lock()
+
+    def order(self) -> List[str]:
+        """Healthy models fastest first, then the ones cooling down (as a last resort)."""
+        now = time.monotonic()
+        with self._lock:
+            ranked = sorted(self.stats, key=lambda name: (not self.stats[name].healthy(now), self.stats[name].score()))
+            healthy = [name for name in ranked if self.stats[name].healthy(now)]
+        if len(healthy) > 1 and random.random() < self.explore_probability:
+            explored = random.choice(healthy[1:])
+            ranked.remove(explored)
+            ranked.insert(0, explored)
+        return ranked
+
+    def record_success(self, name: str, latency: float):
+        with self._lock:
+            stats = self.stats[name]
+            stats.latency = latency if stats.latency is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * stats.latency
+            stats.error_rate *= 1 - EWMA_ALPHA
+            stats.consecutive_failures = 0
+        model_latency.observe(latency, agent=self.agent, model=name)
+        model_calls.inc(agent=self.agent, model=name, outcome="success")
+
+    def record_failure(self, name: str):
+        with self._lock:
+            stats = self.stats[name]
+            stats.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * stats.error_rate
+            stats.consecutive_failures += 1
+            if stats.consecutive_failures >= FAILURES_BEFORE_COOLDOWN:
+                stats.cooldown_until = time.monotonic() + COOLDOWN_SECONDS
+        model_calls.inc(agent=self.agent, model=name, outcome="error")
+
+
+class RoutedModel(Model):
+    """
+    A pydantic-ai model that sends each request to the fastest healthy model of an allowed set.
+
+    Latency is the time to the full response, or to the first chunk for streamed requests. A model
+    that fails is skipped in favour of the next one for the same request, and put on cooldown after
+    repeated failures.
+    """
+
+    def __init__(self, agent: str, models: Dict[str, Model]):
+        self.models = models
+        self.router = ModelRouter(agent, list(models))
+
+    async def request(
+        self,
+        messages: List[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+    ) -> Tuple[ModelResponse, Usage]:
+        errors: List[Exception] = []
+        for name in self.router.order():
+            start = time.perf_counter()
+            try:
+                result = await self.models[name].request(messages, model_settings, model_request_parameters)
+            except fallback_errors() as e:
+                self.router.record_failure(name)
+                errors.append(e)
+                continue
+            self.router.record_success(name, time.perf_counter() - start)
+            return result
+        raise errors[-1]
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: List[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+    ) -> AsyncIterator[StreamedResponse]:
+        errors: List[Exception] = []
+        for name in self.router.order():
+            async with AsyncExitStack() as stack:
+                start = time.perf_counter()
+                try:
+                    response = await stack.enter_async_context(
+                        self.models[name].request_stream(messages, model_settings, model_request_parameters)
+                    )
+                except fallback_errors() as e:
+                    self.router.record_failure(name)
+                    errors.append(e)
+                    continue
+                self.router.record_success(name, time.perf_counter() - start)
+                yield response
+                return
+        raise errors[-1]
+
+    @property
+    def model_name(self) -> str:
+        return f"routed:{','.join(self.models)}"
+
+    @property
+    def system(self) -> str:
+        return next(iter(self.models.values())).system
+
+    @property
+    def base_url(self) -> Optional[str]:
+        return next(iter(self.models.values())).base_url
+
+
+class LazyModel(Model):
+    """
+    A pydantic-ai model that is only built on its first request.
+
+    Agents are module-level objects, so building their models (and the OpenAI client behind them)
+    when the agent is defined would put that work on every process start, even for workers that
+    never call the agent.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Model]):
+        self.name = name
+        self.factory = factory
+        self._model: Optional[Model] = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> Model:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self.factory()
+        return self._model
+
+    async def request(
+        self,
+        messages: List[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+    ) -> Tuple[ModelResponse, Usage]:
+        return await self.model.request(messages, model_settings, model_request_parameters)
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: List[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+    ) -> AsyncIterator[StreamedResponse]:
+        async with self.model.request_stream(messages, model_settings, model_request_parameters) as response:
+            yield response
+
+    @property
+    def model_name(self) -> str:
+        return self.model.model_name
+
+    @property
+    def system(self) -> str:
+        return self.model.system
+
+    @property
+    def base_url(self) -> Optional[str]:
+        return self.model.base_url
+
+
+def build_agent_model(agent: str, names: List[str], create_model: Callable[[str], Model]) -> Model:
+    """A single model when the agent only allows one, otherwise a RoutedModel over all of them."""
+    if len(names) == 1:
+        return create_model(names[0])
+    return RoutedModel(agent, {name: create_model(name) for name in names})
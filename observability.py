@@ -0,0 +1,30 @@
+from dotenv import load_dotenv
+import threading
+
+from metrics import start_metrics_exporters
+
+load_dotenv()
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_observability():
+    """
+    Set up tracing and metrics export, once per process.
+
+    logfire is imported here rather than at module level, since importing it (and the
+    OpenTelemetry SDK behind it) is a large part of startup time.
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+
+    import logfire
+
+    logfire.configure(send_to_logfire='if-token-present')
+
+    # Expose metrics if METRICS_PORT or METRICS_DUMP_INTERVAL is configured
+    start_metrics_exporters()
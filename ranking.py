@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Criterion:
+    column: str
+    weight: float
+    higher_is_better: bool
+
+
+# Default weights. Flights favour price, then total travel time, stops and the user's airlines.
+FLIGHT_CRITERIA = (
+    Criterion("price", 0.4, False),
+    Criterion("duration", 0.2, False),
+    Criterion("stops", 0.15, False),
+    Criterion("preferred", 0.25, True),
+)
+
+# Hotels trade price against rating and amenity match according to the user's budget level
+HOTEL_CRITERIA = {
+    "budget": (Criterion("price", 0.6, False), Criterion("rating", 0.2, True), Criterion("amenity_match", 0.2, True)),
+    "mid-range": (Criterion("price", 0.35, False), Criterion("rating", 0.35, True), Criterion("amenity_match", 0.3, True)),
+    "luxury": (Criterion("price", 0.05, False), Criterion("rating", 0.55, True), Criterion("amenity_match", 0.4, True)),
+}
+
+
+class Ranking(NamedTuple):
+    order: np.ndarray  # candidate indices, best score first
+    scores: np.ndarray  # weighted score per candidate, 0 (worst) to 1 (best)
+    pareto: np.ndarray  # True where no other candidate is both cheaper and better on the other criteria
+
+
+def normalize(values: np.ndarray, higher_is_better: bool) -> np.ndarray:
+    """Min-max scale a column to 0..1 with 1 the best value. Missing values (NaN) score 0."""
+    known = np.isfinite(values)
+    if not known.any():
+        return np.zeros(len(values))
+    low, high = values[known].min(), values[known].max()
+    if high == low:
+        scaled = np.ones(len(values))
+    else:
+        scaled = (values - low) / (high - low)
+        if not higher_is_better:
+            scaled = 1 - scaled
+    return np.where(known, scaled, 0.0)
+
+
+def pareto_frontier(price: np.ndarray, quality: np.ndarray) -> np.ndarray:
+    """
+    Mask of the candidates on the price/quality frontier.
+
+    Sorted by price (best quality first among equal prices), a candidate is on the frontier when
+    its quality beats everything cheaper, which a running maximum finds in one pass.
+    """
+    by_price = np.lexsort((-quality, price))
+    ranked_quality = quality[by_price]
+    best_cheaper = np.maximum.accumulate(np.concatenate(([-np.inf], ranked_quality[:-1])))
+
+    frontier = np.zeros(len(price), dtype=bool)
+    frontier[by_price] = (ranked_quality > best_cheaper) & np.isfinite(price[by_price])
+    return frontier
+
+
+def rank(columns: Dict[str, np.ndarray], criteria: Sequence[Criterion], price_column: str = "price") -> Ranking:
+    """Score columnar candidates by the weighted criteria and find their price/quality Pareto frontier."""
+    count = len(next(iter(columns.values())))
+    scores = np.zeros(count)
+    quality = np.zeros(count)
+    total_weight = quality_weight = 0.0
+
+    for criterion in criteria:
+        if criterion.column not in columns or not criterion.weight:
+            continue
+        weighted = criterion.weight * normalize(np.asarray(columns[criterion.column], dtype=float), criterion.higher_is_better)
+        scores += weighted
+        total_weight += criterion.weight
+        if criterion.column != price_column:
+            quality += weighted
+            quality_weight += criterion.weight
+
+    if total_weight:
+        scores /= total_weight
+    if quality_weight:
+        quality /= quality_weight
+
+    price = np.asarray(columns.get(price_column, np.full(count, np.nan)), dtype=float)
+    return Ranking(np.argsort(-scores, kind="stable"), scores, pareto_frontier(price, quality))
+
+
+def to_float(value: Any) -> float:
+    """A numeric value from the provider data (e.g. 245.5 or "245.50 EUR"), or NaN."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(str(value).split()[0])
+    except (ValueError, IndexError):
+        return np.nan
+
+
+def apply_ranking(candidates: List[Dict[str, Any]], ranking: Ranking) -> List[Dict[str, Any]]:
+    """The candidates in ranked order, each annotated with its score and Pareto flag."""
+    ranked = []
+    for i in ranking.order:
+        candidate = candidates[i]
+        candidate["score"] = round(float(ranking.scores[i]), 3)
+        candidate["pareto"] = bool(ranking.pareto[i])
+        ranked.append(candidate)
+    return ranked
+
+
+def rank_flights(flights: List[Dict[str, Any]], preferred_airlines: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Rank flight search results by price, duration, stops and airline preference."""
+    if not flights:
+        return flights
+    preferred = set(preferred_airlines or [])
+    columns = {
+        "price": np.array([to_float(flight.get("price")) for flight in flights]),
+        "duration": np.array([to_float(flight.get("duration_minutes")) for flight in flights]),
+        "stops": np.array([to_float(flight.get("stops", 0 if flight.get("direct") else 1)) for flight in flights]),
+        "preferred": np.array([flight.get("airline") in preferred for flight in flights], dtype=float),
+    }
+    return apply_ranking(flights, rank(columns, FLIGHT_CRITERIA))
+
+
+def rank_hotels(hotels: List[Dict[str, Any]], preferred_amenities: Optional[List[str]] = None, budget_level: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Rank hotel search results by price, rating and amenity match, weighted for the budget level."""
+    if not hotels:
+        return hotels
+    preferred = set(preferred_amenities or [])
+    for hotel in hotels:
+        hotel["matching_amenities"] = [a for a in hotel.get("amenities", []) if a in preferred]
+        hotel["preference_score"] = len(hotel["matching_amenities"])
+    columns = {
+        "price": np.array([to_float(hotel.get("price_per_night")) for hotel in hotels]),
+        "rating": np.array([to_float(hotel.get("rating")) for hotel in hotels]),
+        "amenity_match": np.array([hotel["preference_score"] / len(preferred) if preferred else 0.0 for hotel in hotels]),
+    }
+    criteria = HOTEL_CRITERIA.get(budget_level or "mid-range", HOTEL_CRITERIA["mid-range"])
+    return apply_ranking(hotels, rank(columns, criteria))
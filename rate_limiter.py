@@ -0,0 +1,300 @@
+from email.utils import parsedate_to_datetime
+from typing import Optional, Mapping
+from dotenv import load_dotenv
+import threading
+import asyncio
+import random
+import time
+import re
+import os
+
+import httpx
+
+from metrics import llm_rate_limit_wait_seconds, llm_request_seconds, llm_requests
+
+load_dotenv()
+
+# Default budget matches the free-tier limits the graph was originally tuned for (3 RPM).
+# Both values are refined at runtime from the provider's x-ratelimit-* headers.
+DEFAULT_REQUESTS_PER_MINUTE = 3
+DEFAULT_TOKENS_PER_MINUTE = 0  # 0 means "no token limit known yet"
+
+# Server errors worth retrying; other 4xx/5xx responses go straight back to the caller
+RETRYABLE_STATUS_CODES = (500, 502, 503, 504)
+
+# Rough characters-per-token ratio used to estimate the cost of a request before it is sent
+CHARS_PER_TOKEN = 4
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+
+def parse_reset_duration(value: str) -> Optional[float]:
+    """Parse an OpenAI style reset duration such as '1s', '6m0s' or '20ms' into seconds."""
+    value = value.strip()
+    if not value:
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+
+    units = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Get the number of seconds the server asked us to wait, if any."""
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+
+    # Retry-After may also be an HTTP date
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """A continuously refilling bucket that allows going into debt to reserve future capacity."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    @property
+    def rate(self) -> float:
+        """Refill rate in units per second."""
+        return self.capacity / 60.0
+
+    def refill(self, now: float):
+        if self.enabled:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` from the bucket and return how long the caller must wait for it."""
+        if not self.enabled:
+            return 0.0
+
+        self.refill(now)
+        # A single request larger than the whole bucket would otherwise wait forever
+        self.level -= min(amount, self.capacity)
+        if self.level >= 0:
+            return 0.0
+        return -self.level / self.rate
+
+    def set_limit(self, per_minute: float, now: float):
+        self.refill(now)
+        if per_minute > 0 and per_minute != self.capacity:
+            # Keep the same proportion of budget available under the new limit
+            fraction = self.level / self.capacity if self.enabled else 1.0
+            self.capacity = float(per_minute)
+            self.level = fraction * self.capacity
+
+    def set_remaining(self, remaining: float, reset_after: Optional[float], now: float):
+        """Trust the server's view of how much budget is left."""
+        self.refill(now)
+        if not self.enabled:
+            return
+        self.level = min(self.level, remaining)
+        if remaining <= 0 and reset_after:
+            # Make the bucket refill exactly when the server says the window resets
+            self.level = min(self.level, -reset_after * self.rate)
+
+
+class RateLimiter:
+    """
+    Process-wide limiter for LLM requests that is aware of both requests and tokens per minute.
+
+    Requests run immediately while there is budget and only wait when there isn't. The budget
+    adapts to the x-ratelimit-* and Retry-After headers returned by the provider.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE,
+        max_retries: int = 5,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.blocked_until = 0.0
+        self.total_wait = 0.0
+
+        # A threading lock (not an asyncio one) so the limiter can be shared by every event loop
+        # in the process - Streamlit runs each session on its own loop and thread
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'RateLimiter':
+        return cls(
+            requests_per_minute=float(os.getenv('LLM_REQUESTS_PER_MINUTE') or DEFAULT_REQUESTS_PER_MINUTE),
+            tokens_per_minute=float(os.getenv('LLM_TOKENS_PER_MINUTE') or DEFAULT_TOKENS_PER_MINUTE)
+        )
+
+    def reserve(self, tokens: float = 0) -> float:
+        """Reserve budget for one request and return how many seconds to wait before sending it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.requests.reserve(1, now),
+                self.tokens.reserve(tokens, now),
+                self.blocked_until - now
+            )
+            self.total_wait += max(wait, 0.0)
+            return max(wait, 0.0)
+
+    async def acquire(self, tokens: float = 0) -> float:
+        """Wait until there is budget for one request using roughly `tokens` tokens, returning the wait."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def block_for(self, seconds: float):
+        """Hold back every caller for `seconds`, e.g. after a Retry-After header."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff that never undercuts the server's Retry-After."""
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Refine the budget from the provider's rate limit headers."""
+        with self._lock:
+            now = time.monotonic()
+            for bucket, kind in ((self.requests, 'requests'), (self.tokens, 'tokens')):
+                limit = _to_float(headers.get(f'x-ratelimit-limit-{kind}'))
+                remaining = _to_float(headers.get(f'x-ratelimit-remaining-{kind}'))
+                reset = headers.get(f'x-ratelimit-reset-{kind}')
+                reset_after = parse_reset_duration(reset) if reset else None
+
+                if limit:
+                    bucket.set_limit(limit, now)
+                if remaining is not None:
+                    bucket.set_remaining(remaining, reset_after, now)
+
+            # OpenRouter style headers: a single request window with an epoch (ms) reset time
+            remaining = _to_float(headers.get('x-ratelimit-remaining'))
+            reset = _to_float(headers.get('x-ratelimit-reset'))
+            if remaining is not None and remaining <= 0 and reset:
+                self.blocked_until = max(self.blocked_until, now + max(0.0, reset / 1000 - time.time()))
+
+    async def handle_response(self, response: httpx.Response):
+        """httpx response hook that keeps the limiter in sync with the provider."""
+        self.update_from_headers(response.headers)
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers)
+            if retry_after:
+                self.block_for(retry_after)
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def estimate_request_tokens(request: httpx.Request) -> float:
+    """Estimate the tokens a chat completion request will consume from the size of its body."""
+    try:
+        body = request.content
+    except httpx.RequestNotRead:
+        return 0
+    return len(body) / CHARS_PER_TOKEN
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that routes every request through the shared rate limiter.
+
+    A 429 response blocks all callers for the Retry-After period and is retried with jittered
+    exponential backoff before being handed back to the OpenAI client. Server errors (5xx) and
+    dropped connections are retried the same way up to `max_error_retries` times, so this is the
+    one place that decides how LLM calls are retried.
+    """
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_error_retries: int = 0
+    ):
+        self.limiter = limiter
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.max_error_retries = max_error_retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = estimate_request_tokens(request)
+
+        attempt = 0
+        errors = 0
+        while True:
+            llm_rate_limit_wait_seconds.observe(await self.limiter.acquire(tokens))
+            start = time.perf_counter()
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError:
+                llm_requests.inc(status="transport_error")
+                if errors >= self.max_error_retries:
+                    raise
+                await asyncio.sleep(self.limiter.backoff_delay(errors))
+                errors += 1
+                continue
+            llm_request_seconds.observe(time.perf_counter() - start)
+            llm_requests.inc(status=response.status_code)
+            await self.limiter.handle_response(response)
+
+            if response.status_code == 429 and attempt < self.limiter.max_retries:
+                retry_after = parse_retry_after(response.headers)
+                delay = self.limiter.backoff_delay(attempt, retry_after)
+                attempt += 1
+            elif response.status_code in RETRYABLE_STATUS_CODES and errors < self.max_error_retries:
+                delay = self.limiter.backoff_delay(errors, parse_retry_after(response.headers))
+                errors += 1
+            else:
+                return response
+
+            # Release the connection before backing off and trying again
+            await response.aclose()
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+# The single limiter shared by every agent in the process
+llm_rate_limiter = RateLimiter.from_env()
@@ -0,0 +1,189 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+from functools import wraps
+from dotenv import load_dotenv
+import threading
+import asyncio
+import time
+import re
+import os
+
+from metrics import registry
+
+load_dotenv()
+
+# Consecutive failures that open a provider's circuit, and how long it stays open before a trial call
+FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30'))
+
+# Hedged requests: send a duplicate once a call is slower than the provider's p95 latency
+HEDGE_REQUESTS = os.getenv('HEDGE_REQUESTS', 'false').lower() in ('1', 'true', 'yes')
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20  # don't hedge on a p95 estimated from too few calls
+HEDGE_MIN_DELAY = 0.05
+
+# In-band error messages for requests that raised (connection errors, timeouts) or, for the Amadeus
+# token, got a 5xx - the provider failed
+PROVIDER_FAILURE_MARKERS = ("request failed", "lookup failed")
+
+# "... API error: 503" - only 5xx statuses are the provider's fault. A 4xx is caused by the request
+# (an unknown city, a past date) and must not open the circuit for every user.
+API_ERROR_STATUS = re.compile(r'API error: (\d{3})')
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+provider_seconds = registry.summary("travel_provider_seconds", "Latency of successful provider calls")
+circuit_state = registry.gauge("travel_circuit_open", "Provider circuit state (0 closed, 1 half open, 2 open)")
+circuit_rejections = registry.counter("travel_circuit_rejections_total", "Provider calls failed fast by an open circuit")
+hedged_requests = registry.counter("travel_hedged_requests_total", "Hedged provider calls by which attempt answered first")
+
+
+def is_failure_message(error: str) -> bool:
+    status = API_ERROR_STATUS.search(error)
+    if status:
+        return int(status.group(1)) >= 500
+    return any(marker in error for marker in PROVIDER_FAILURE_MARKERS)
+
+
+def is_provider_failure(result: Any) -> bool:
+    """Whether an in-band provider result reports that the provider failed (5xx, timeout or exception)."""
+    errors = [result] if isinstance(result, dict) else result if isinstance(result, list) else []
+    return any(isinstance(item, dict) and is_failure_message(str(item.get('error', ''))) for item in errors)
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit for one provider.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls fail fast. Once
+    `reset_timeout` seconds have passed a single trial call is let through (half open): success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.trial_in_flight = False
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def release(self):
+        """Give up a trial call without an outcome (e.g. the caller was cancelled)."""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def _set_state(self, state: str):
+        self.state = state
+        circuit_state.set((CLOSED, HALF_OPEN, OPEN).index(state), provider=self.name)
+
+
+breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    breaker = breakers.get(provider)
+    if breaker is None:
+        breaker = breakers.setdefault(provider, CircuitBreaker(provider))
+    return breaker
+
+
+def hedge_delay(provider: str) -> Optional[float]:
+    """The provider's recent p95 latency, or None while there are too few samples to trust it."""
+    if provider_seconds.count(provider=provider) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(HEDGE_MIN_DELAY, provider_seconds.quantiles(provider=provider)[HEDGE_QUANTILE])
+
+
+async def hedged(call: Callable[[], Awaitable[Any]], delay: float, provider: str) -> Any:
+    """Run `call`, starting a duplicate if it hasn't answered after `delay`; the first good answer wins."""
+    primary = asyncio.ensure_future(call())
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+
+    hedge = asyncio.ensure_future(call())
+    pending = {primary, hedge}
+    try:
+        last = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                last = task
+                if task.exception() is None and not is_provider_failure(task.result()):
+                    hedged_requests.inc(provider=provider, winner="hedge" if task is hedge else "primary")
+                    return task.result()
+        return last.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def guarded(provider: str, list_result: bool = True, hedge: bool = HEDGE_REQUESTS) -> Callable:
+    """
+    Put an async provider function behind the provider's circuit breaker, optionally hedging slow calls.
+
+    While the circuit is open the function is not called and an in-band error is returned right away,
+    so callers move on to their fallback data instead of waiting for the HTTP timeout.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            breaker = get_breaker(provider)
+            if not breaker.allow():
+                circuit_rejections.inc(provider=provider)
+                error = {"error": f"{provider.capitalize()} provider temporarily unavailable"}
+                return [error] if list_result else error
+
+            start = time.perf_counter()
+            try:
+                delay = hedge_delay(provider) if hedge else None
+                if delay is None:
+                    result = await func(*args, **kwargs)
+                else:
+                    result = await hedged(lambda: func(*args, **kwargs), delay, provider)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception:
+                breaker.record_failure()
+                raise
+
+            if is_provider_failure(result):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+                provider_seconds.observe(time.perf_counter() - start, provider=provider)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,303 @@
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Optional, Tuple
+from functools import wraps
+from dotenv import load_dotenv
+import threading
+import asyncio
+import inspect
+import copy
+import sqlite3
+import json
+import time
+import os
+
+from single_flight import SingleFlight
+
+load_dotenv()
+
+# Time-to-live per provider, in seconds
+PROVIDER_TTLS = {
+    "flights": 15 * 60,
+    "hotels": 60 * 60,
+    "weather": 30 * 60,
+    "hotel_destinations": 7 * 24 * 60 * 60,
+    "iata_codes": 7 * 24 * 60 * 60,
+}
+
+MEMORY_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MEMORY_ENTRIES', '512'))
+DISK_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_DISK_ENTRIES', '10000'))
+
+# Set RESPONSE_CACHE_PATH to an empty value to keep the cache in memory only
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "responses.sqlite")
+CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', DEFAULT_CACHE_PATH)
+
+
+def normalize_value(value: Any) -> Any:
+    """Normalize a parameter so trivially different searches share a cache entry."""
+    if isinstance(value, str):
+        return " ".join(value.split()).lower()
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: normalize_value(v) for k, v in sorted(value.items())}
+    return value
+
+
+def make_key(provider: str, params: Dict[str, Any]) -> str:
+    """Build a stable cache key from the provider name and its normalized parameters."""
+    normalized = {name: normalize_value(value) for name, value in sorted(params.items())}
+    return f"{provider}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+
+def is_error_result(result: Any) -> bool:
+    """Provider functions report failures in-band; those results must never be cached."""
+    if isinstance(result, dict):
+        return 'error' in result
+    if isinstance(result, list):
+        return not result or any(isinstance(item, dict) and 'error' in item for item in result)
+    return result is None
+
+
+class MemoryTier:
+    """Size-bounded LRU of (expires_at, value) pairs."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str, now: float) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: str, value: Any, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskTier:
+    """
+    SQLite-backed tier that survives restarts and is shared by every worker on the machine.
+
+    Reads and writes run on worker threads (see ResponseCache.aget/aset), so the connection is
+    used by one thread at a time under its own lock.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float) -> Tuple[bool, Any, float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False, None, 0.0
+            value, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return False, None, 0.0
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return True, json.loads(value), expires_at
+
+    def set(self, key: str, value: Any, expires_at: float, now: float):
+        value = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now)
+            )
+            self._writes += 1
+            # Evicting on every write would cost a COUNT(*) per request, so do it periodically
+            if self._writes % 100 == 0:
+                self._evict(now)
+
+    def evict(self, now: float):
+        """Drop expired rows, then the least recently used rows over the size bound."""
+        with self._lock:
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+
+class ResponseCache:
+    """
+    Two-tier TTL cache for provider responses: an in-memory LRU in front of a local SQLite file.
+
+    Entries are keyed by provider and normalized request parameters, and every provider has its
+    own time-to-live. Hits and misses are counted per provider and tier.
+    """
+
+    def __init__(self, path: Optional[str] = CACHE_PATH, memory_entries: int = MEMORY_MAX_ENTRIES,
+                 disk_entries: int = DISK_MAX_ENTRIES, ttls: Optional[Dict[str, float]] = None):
+        self.ttls = dict(PROVIDER_TTLS if ttls is None else ttls)
+        self.memory = MemoryTier(memory_entries)
+        self.disk: Optional[DiskTier] = None
+        if path:
+            try:
+                self.disk = DiskTier(path, disk_entries)
+            except sqlite3.Error as e:
+                # The cache is an optimization - never fail a search because the disk tier is unavailable
+                print(f"Response cache disk tier disabled: {e}")
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, key: str, record_stats: bool = True) -> Tuple[bool, Any]:
+        now = time.time()
+        found, value, stats = self._get_memory(provider, key, now, record_stats)
+        if found or self.disk is None:
+            return found, value
+        return self._promote(key, stats, *self.disk.get(key, now))
+
+    async def aget(self, provider: str, key: str) -> Tuple[bool, Any]:
+        """Like get, but reads the disk tier on a worker thread instead of blocking the event loop."""
+        now = time.time()
+        found, value, stats = self._get_memory(provider, key, now, True)
+        if found or self.disk is None:
+            return found, value
+        return self._promote(key, stats, *await asyncio.to_thread(self.disk.get, key, now))
+
+    def _get_memory(self, provider: str, key: str, now: float, record_stats: bool) -> Tuple[bool, Any, Dict[str, int]]:
+        with self._lock:
+            stats = self._stats[provider] if record_stats else {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+            found, value = self.memory.get(key, now)
+            if found:
+                stats["memory_hits"] += 1
+            elif self.disk is None:
+                stats["misses"] += 1
+            return found, value, stats
+
+    def _promote(self, key: str, stats: Dict[str, int], found: bool, value: Any, expires_at: float) -> Tuple[bool, Any]:
+        """Count a disk lookup and move a hit to the memory tier, keeping the original expiry."""
+        with self._lock:
+            if found:
+                self.memory.set(key, value, expires_at)
+                stats["disk_hits"] += 1
+            else:
+                stats["misses"] += 1
+        return found, value
+
+    def set(self, provider: str, key: str, value: Any):
+        expires_at, now = self._set_memory(provider, key, value)
+        if self.disk is not None:
+            self.disk.set(key, value, expires_at, now)
+
+    async def aset(self, provider: str, key: str, value: Any):
+        """Like set, but writes the disk tier on a worker thread instead of blocking the event loop."""
+        expires_at, now = self._set_memory(provider, key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value, expires_at, now)
+
+    def _set_memory(self, provider: str, key: str, value: Any) -> Tuple[float, float]:
+        now = time.time()
+        expires_at = now + self.ttls.get(provider, 300)
+        with self._lock:
+            self.memory.set(key, value, expires_at)
+        return expires_at, now
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+            if self.disk is not None:
+                self.disk.clear()
+            self._stats.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss counts and hit ratio per provider."""
+        with self._lock:
+            report = {}
+            for provider, counts in self._stats.items():
+                lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+                hits = counts["memory_hits"] + counts["disk_hits"]
+                report[provider] = {**counts, "hit_ratio": hits / lookups if lookups else 0.0}
+            return report
+
+
+# The cache shared by all provider functions in the process
+response_cache = ResponseCache()
+
+
+# Misses for the same key share one in-flight provider call
+in_flight = SingleFlight("provider_calls")
+
+
+def cached(provider: str, cache: Optional[ResponseCache] = None) -> Callable:
+    """
+    Cache the successful results of an async provider function, keyed by its normalized arguments.
+
+    Concurrent misses for the same key are coalesced into a single call.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            store = cache or response_cache
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = make_key(provider, bound.arguments)
+
+            found, value = await store.aget(provider, key)
+            if found:
+                # Callers annotate and re-sort results in place, so never hand out the cached object
+                return copy.deepcopy(value)
+
+            async def fetch():
+                result = await func(*args, **kwargs)
+                if not is_error_result(result):
+                    await store.aset(provider, key, copy.deepcopy(result))
+                return result
+
+            # Identical searches already in flight in any session are joined instead of repeated
+            result = await in_flight.do(key, fetch)
+            return copy.deepcopy(result)
+
+        def peek(*args, **kwargs) -> Optional[Any]:
+            """The cached result for these arguments, without calling the provider (None if not cached)."""
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            found, value = (cache or response_cache).get(provider, make_key(provider, bound.arguments), record_stats=False)
+            return copy.deepcopy(value) if found else None
+
+        wrapper.uncached = func
+        wrapper.peek = peek
+        return wrapper
+
+    return decorator
@@ -0,0 +1,106 @@
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+import threading
+import asyncio
+
+from metrics import registry
+
+coalesced_calls = registry.counter(
+    "travel_coalesced_calls_total",
+    "Provider calls by whether they led a shared in-flight call or joined one"
+)
+
+
+class _Call:
+    """One in-flight call and the callers waiting on it."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future: Future = Future()
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one in-flight call whose result every caller shares.
+
+    Streamlit sessions run on different threads and event loops, so the shared call runs as a task on
+    the loop of the first caller and publishes its outcome through a thread-safe future that callers
+    on any loop can await. Exceptions reach every waiter. A caller that is cancelled only stops
+    waiting; the shared call is cancelled once nobody waits for it, and if it dies with its loop the
+    remaining callers start a new one.
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `func`, or join the call already in flight for `key`, and return its result."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None or call.future.done():
+                    call = _Call(loop)
+                    call.task = loop.create_task(self._run(key, call, func))
+                    self._calls[key] = call
+                    coalesced_calls.inc(name=self.name, role="leader")
+                else:
+                    coalesced_calls.inc(name=self.name, role="follower")
+                call.waiters += 1
+
+            waiter = asyncio.wrap_future(call.future)
+            waiter.add_done_callback(_retrieve_exception)
+            try:
+                # Shielded, so a cancelled caller leaves the shared future alone
+                return await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling() or not call.future.cancelled():
+                    raise
+                # The shared call was cancelled (e.g. its loop shut down) - start over
+            finally:
+                with self._lock:
+                    call.waiters -= 1
+                    abandoned = call.waiters == 0 and not call.future.done()
+                    if abandoned and self._calls.get(key) is call:
+                        del self._calls[key]
+                if abandoned:
+                    _cancel_threadsafe(call)
+
+    async def _run(self, key: str, call: _Call, func: Callable[[], Awaitable[Any]]):
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self._finish(key, call)
+            call.future.cancel()
+            raise
+        except BaseException as e:
+            self._finish(key, call)
+            call.future.set_exception(e)
+        else:
+            self._finish(key, call)
+            call.future.set_result(result)
+
+    def _finish(self, key: str, call: _Call):
+        # Forget the call before publishing its outcome, so later callers start a fresh one
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+def _cancel_threadsafe(call: _Call):
+    if call.task is not None and not call.loop.is_closed():
+        call.loop.call_soon_threadsafe(call.task.cancel)
+
+
+def _retrieve_exception(future: asyncio.Future):
+    # Waiters that gave up must not log "exception was never retrieved"
+    if not future.cancelled():
+        future.exception()
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import threading
+import asyncio
+import os
+
+from metrics import registry
+
+# How many conversations keep speculative lookups around at once
+MAX_THREADS = int(os.getenv('SPECULATIVE_PREFETCH_THREADS', '256'))
+
+prefetch_outcomes = registry.counter(
+    "travel_speculative_prefetch_total",
+    "Speculative provider lookups by outcome (started, hit, miss, cancelled)"
+)
+
+Lookup = Tuple[Callable[..., Awaitable[Any]], Tuple[Any, ...]]
+
+
+class SpeculativePrefetcher:
+    """
+    Starts provider lookups in the background while the info gathering agent is still streaming.
+
+    Each conversation has a few named slots (outbound flights, hotels, ...). `update` is called with
+    the lookups the partial travel details already allow; a slot whose arguments changed has its
+    stale task cancelled and replaced. The recommendation nodes then call `result`, which awaits
+    the speculative task when its arguments match and falls back to a direct call otherwise.
+    """
+
+    def __init__(self, max_threads: int = MAX_THREADS):
+        self.max_threads = max_threads
+        # thread_id -> slot -> (arguments, task)
+        self._threads: "OrderedDict[str, Dict[str, Tuple[Hashable, asyncio.Task]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, thread_id: str, lookups: Dict[str, Lookup]):
+        """Start the lookups that are new, cancelling any slot whose arguments have changed."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            slots = self._threads.setdefault(thread_id, {})
+            self._threads.move_to_end(thread_id)
+
+            for slot, (func, args) in lookups.items():
+                key = _lookup_key(func, args)
+                current = slots.get(slot)
+                if current is not None:
+                    current_key, task = current
+                    if current_key == key and task.get_loop() is loop and not task.cancelled():
+                        continue
+                    self._cancel(task)
+                task = loop.create_task(func(*args))
+                task.add_done_callback(_retrieve_exception)
+                slots[slot] = (key, task)
+                prefetch_outcomes.inc(outcome="started")
+
+            while len(self._threads) > self.max_threads:
+                _, evicted = self._threads.popitem(last=False)
+                for _, task in evicted.values():
+                    self._cancel(task)
+
+    async def result(self, thread_id: str, slot: str, func: Callable[..., Awaitable[Any]], *args) -> Any:
+        """Get a lookup's result, reusing the speculative task when it was started with the same arguments."""
+        task = self._take(thread_id, slot, _lookup_key(func, args))
+        if task is not None:
+            try:
+                result = await task
+                prefetch_outcomes.inc(outcome="hit")
+                return result
+            except asyncio.CancelledError:
+                # Only fall through when the speculative task itself was cancelled, not the caller
+                if not task.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            except Exception:
+                # A failed speculation is retried directly below
+                pass
+
+        prefetch_outcomes.inc(outcome="miss")
+        return await func(*args)
+
+    def discard(self, thread_id: str):
+        """Cancel and forget every speculative lookup of a conversation."""
+        with self._lock:
+            slots = self._threads.pop(thread_id, {})
+        for _, task in slots.values():
+            self._cancel(task)
+
+    def _take(self, thread_id: str, slot: str, key: Hashable) -> Optional[asyncio.Task]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            slots = self._threads.get(thread_id)
+            if not slots or slot not in slots:
+                return None
+            current_key, task = slots.pop(slot)
+            if not slots:
+                del self._threads[thread_id]
+        # Tasks from an earlier Streamlit run belong to a loop that no longer runs
+        if current_key != key or task.get_loop() is not loop:
+            self._cancel(task)
+            return None
+        return task
+
+    def _cancel(self, task: asyncio.Task):
+        if task.done():
+            return
+        prefetch_outcomes.inc(outcome="cancelled")
+        if task.get_loop().is_closed():
+            return
+        task.get_loop().call_soon_threadsafe(task.cancel)
+
+
+def _retrieve_exception(task: asyncio.Task):
+    # A speculation nobody ends up awaiting must not log "exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+def _lookup_key(func: Callable, args: Tuple[Any, ...]) -> Hashable:
+    return (getattr(func, "__qualname__", repr(func)), tuple(tuple(a) if isinstance(a, list) else a for a in args))
+
+
+# The prefetcher shared by every conversation in the process
+speculative_prefetcher = SpeculativePrefetcher()
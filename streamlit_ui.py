@@ -9,8 +9,11 @@ import uuid
 import json
 import os
 
-from agent_graph import travel_agent_graph
+from agent_graph import get_travel_agent_graph, prepare_agents
+from deadlines import deadline_config
 from utils import get_country_suggestions, get_popular_cities
+from locations import location_index
+from http_sessions import start_http_sessions, close_http_sessions
 
 
 # Page configuration
@@ -43,6 +46,15 @@ class UserContext(BaseModel):
     hotel_amenities: List[str]
     budget_level: str
 
+@st.cache_resource
+def prepare_graph():
+    # Compile the graph and build the agents' models once per server process, when the page
+    # first loads, instead of on the first message
+    prepare_agents()
+    return get_travel_agent_graph()
+
+travel_agent_graph = prepare_graph()
+
 @st.cache_resource
 def get_thread_id():
     return str(uuid.uuid4())
@@ -97,39 +109,45 @@ async def invoke_agent_graph(user_input: str):
     """
     Run the agent with streaming text for the user_input prompt,
     while maintaining the entire conversation in `st.session_state.messages`.
+
+    Final plan tokens are yielded as they arrive on the graph's custom stream; any other
+    response (e.g. a request for more details) is yielded once the run finishes.
     """
-    config = {
-        "configurable": {
-            "thread_id": thread_id
-        }
-    }
+    # Each message gets a fresh time budget for its run through the graph
+    config = deadline_config(thread_id)
 
     try:
         # First message from user
         if len(st.session_state.chat_history) == 1:
             user_context = st.session_state.user_context
-            initial_state = {
+            graph_input = {
                 "user_input": user_input,
                 "preferred_airlines": user_context.preferred_airlines,
                 "hotel_amenities": user_context.hotel_amenities,
                 "budget_level": user_context.budget_level,
                 "travel_details": {},
-                "flight_results": [],
-                "hotel_results": [],
-                "activity_results": [],
+                "flight_results": {},
+                "hotel_results": {},
+                "activity_results": {},
                 "final_plan": ""
             }
 
-            # Run the graph and get the final result
-            result = await travel_agent_graph.ainvoke(initial_state, config)
-            yield extract_response_from_result(result)
-
         # Continue the conversation (handle interrupts)
         else:
             # Resume with user input
-            result = await travel_agent_graph.ainvoke(
-                Command(resume=user_input), config
-            )
+            graph_input = Command(resume=user_input)
+
+        # Stream the graph: "custom" carries final plan deltas, "values" the latest full state
+        streamed_plan = False
+        result = {}
+        async for mode, chunk in travel_agent_graph.astream(graph_input, config, stream_mode=["custom", "values"]):
+            if mode == "custom" and isinstance(chunk, dict) and "final_plan_delta" in chunk:
+                streamed_plan = True
+                yield chunk["final_plan_delta"]
+            elif mode == "values":
+                result = chunk
+
+        if not streamed_plan:
             yield extract_response_from_result(result)
 
     except Exception as e:
@@ -148,6 +166,25 @@ async def main():
 
         st.subheader("🌍 Quick Location Suggestions")
 
+        # Autocomplete from the local airport and city index (no network round trip per keystroke)
+        location_query = st.text_input("Search a city or airport:", key="location_search")
+        if location_query:
+            matches = location_index.complete(location_query)
+            if matches:
+                selected_match = st.selectbox(
+                    "Matching destinations:",
+                    matches,
+                    format_func=lambda location: location.label,
+                    key="location_match"
+                )
+                suggestion_text = f"I want to go to {selected_match.city}, {selected_match.country} (airport code {selected_match.code})"
+                if st.button("Use this destination", key="use_search_destination"):
+                    st.session_state.suggested_destination = suggestion_text
+                    st.success(f"Suggested: {suggestion_text}")
+                    st.info("💡 Now type your travel details in the chat below!")
+            else:
+                st.caption("No matching cities or airports.")
+
         # Popular destinations
         st.write("**Popular Countries:**")
         countries = get_country_suggestions()
@@ -311,5 +348,14 @@ async def main():
     st.divider()
     st.caption("Powered by Pydantic AI and LangGraph | Built with Streamlit")
 
+async def run_app():
+    # Every Streamlit rerun gets its own event loop, so the pooled HTTP sessions for the
+    # provider APIs are opened at the start of the run and closed cleanly at the end
+    await start_http_sessions()
+    try:
+        await main()
+    finally:
+        await close_http_sessions()
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(run_app())
@@ -1,47 +1,85 @@
-from pydantic_ai.models.openai import OpenAIModel
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import os
 import requests
 import json
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
 import asyncio
-import aiohttp
+import weakref
+import threading
+import time
+import httpx
+
+from rate_limiter import llm_rate_limiter, RateLimitedTransport
+from http_sessions import get_http_session, llm_transport
+from response_cache import cached
+from locations import location_index, resolve_iata
+from flight_offers import FlightOffers
+from resilience import guarded
+from model_router import build_agent_model, LazyModel
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 load_dotenv()
 
-def get_model():
-    provider_name = os.getenv('PROVIDER', 'OpenAI')
-    llm = os.getenv('MODEL_CHOICE', 'gpt-4o-mini')
-    base_url = os.getenv('BASE_URL', 'https://api.openai.com/v1')
-    api_key = os.getenv('LLM_API_KEY', 'no-api-key-provided')
-
-    # Create AsyncOpenAI client based on provider
-    if provider_name == 'OpenRouter':
-        # OpenRouter configuration with required headers
-        client = AsyncOpenAI(
-            base_url=base_url,
-            api_key=api_key,
-            default_headers={
+# One timeout and retry policy for every LLM call. Retries happen in the rate limited transport
+# (429s, 5xx and dropped connections), so the OpenAI client itself doesn't retry on top of it.
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '60'))
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', '10'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+
+_llm_client: Optional["AsyncOpenAI"] = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_http_client() -> httpx.AsyncClient:
+    """Create an HTTP client whose requests all go through the shared LLM rate limiter and connection pool."""
+    return httpx.AsyncClient(
+        transport=RateLimitedTransport(llm_rate_limiter, llm_transport, max_error_retries=LLM_MAX_RETRIES),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+    )
+
+def get_llm_client() -> "AsyncOpenAI":
+    """Get the AsyncOpenAI client shared by every agent and model, creating it on first use."""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is not None:
+            return _llm_client
+
+        # Imported here so that only processes that actually call a model pay for the import
+        from openai import AsyncOpenAI
+
+        provider_name = os.getenv('PROVIDER', 'OpenAI')
+        base_url = os.getenv('BASE_URL', 'https://api.openai.com/v1')
+        api_key = os.getenv('LLM_API_KEY', 'no-api-key-provided')
+
+        default_headers = None
+        if provider_name == 'OpenRouter':
+            # OpenRouter requires these headers
+            default_headers = {
                 "HTTP-Referer": "http://localhost:8501",  # Your site URL
                 "X-Title": "Travel Agent App"  # Your app name
             }
-        )
-    elif provider_name == 'OpenAI':
-        # Standard OpenAI configuration with rate limiting
-        client = AsyncOpenAI(
-            api_key=api_key,
-            max_retries=3,
-            timeout=60.0
-        )
-    else:
-        # Generic configuration for other providers
-        client = AsyncOpenAI(
-            base_url=base_url,
+
+        _llm_client = AsyncOpenAI(
+            # The OpenAI provider always uses the official endpoint
+            base_url=None if provider_name == 'OpenAI' else base_url,
             api_key=api_key,
-            max_retries=3,
-            timeout=60.0
+            http_client=get_llm_http_client(),
+            default_headers=default_headers,
+            max_retries=0,
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
         )
+        return _llm_client
+
+async def warm_llm_connection():
+    """Open a connection to the LLM endpoint on the running loop ahead of the first model call."""
+    await llm_transport.warm(str(get_llm_client().base_url))
+
+def get_model(model_choice: Optional[str] = None):
+    from pydantic_ai.models.openai import OpenAIModel
+
+    llm = model_choice or os.getenv('MODEL_CHOICE', 'gpt-4o-mini')
+    client = get_llm_client()
 
     # Create the model using the async client
     return OpenAIModel(
@@ -49,6 +87,18 @@ def get_model():
         openai_client=client
     )
 
+def get_agent_model(agent: str):
+    """
+    Get the model for one agent. <AGENT>_MODELS (e.g. FINAL_PLANNER_MODELS=gpt-4o,gpt-4o-mini) lists
+    the models the agent may use; with several, each call goes to the fastest healthy one.
+    Agents without their own setting use MODEL_CHOICE. The model is built on the agent's first call.
+    """
+    configured = os.getenv(f'{agent.upper()}_MODELS', '')
+    names = [name.strip() for name in configured.split(',') if name.strip()]
+    if not names:
+        return LazyModel(agent, get_model)
+    return LazyModel(agent, lambda: build_agent_model(agent, names, get_model))
+
 # API Configuration
 WEATHER_API_KEY = os.getenv('WEATHER_API_KEY')
 FLIGHT_API_KEY = os.getenv('FLIGHT_API_KEY')
@@ -62,6 +112,25 @@ WEATHER_BASE_URL = "http://api.openweathermap.org/data/2.5"
 AMADEUS_BASE_URL = "https://test.api.amadeus.com"
 HOTEL_BASE_URL = "https://booking-com.p.rapidapi.com"
 
+# Flexible-date flight searches: widest window (in days either side) and parallel searches
+FLEX_SEARCH_MAX_DAYS = 7
+FLEX_SEARCH_CONCURRENCY = int(os.getenv('FLIGHT_FLEX_CONCURRENCY', '4'))
+# Only the cheapest fare per day is needed, and Amadeus returns the cheapest offers first
+FLEX_SEARCH_MAX_OFFERS = 5
+
+# Offers requested per flight search (Amadeus allows up to 250) and how many of the best are kept,
+# on top of the Pareto-optimal ones and the cheapest per airline
+FLIGHT_MAX_OFFERS = int(os.getenv('FLIGHT_MAX_OFFERS', '250'))
+FLIGHT_SHORTLIST = int(os.getenv('FLIGHT_SHORTLIST', '10'))
+
+# Hotel searches: result pages read at most, pages requested at the same time, and how many
+# matching hotels are enough to stop paging
+HOTEL_MAX_PAGES = int(os.getenv('HOTEL_MAX_PAGES', '5'))
+HOTEL_PAGE_CONCURRENCY = int(os.getenv('HOTEL_PAGE_CONCURRENCY', '3'))
+HOTEL_CANDIDATES = int(os.getenv('HOTEL_CANDIDATES', '10'))
+
+@cached("weather")
+@guarded("weather", list_result=False)
 async def get_weather_data(city: str, country_code: str = None) -> Dict[str, Any]:
     """Get weather data for a city using OpenWeatherMap API."""
     if not WEATHER_API_KEY:
@@ -76,107 +145,208 @@ async def get_weather_data(city: str, country_code: str = None) -> Dict[str, Any
             'units': 'metric'
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return {
-                        'temperature': data['main']['temp'],
-                        'description': data['weather'][0]['description'],
-                        'humidity': data['main']['humidity'],
-                        'wind_speed': data['wind']['speed'],
-                        'country': data['sys']['country'],
-                        'city': data['name']
-                    }
-                else:
-                    return {"error": f"Weather API error: {response.status}"}
+        session = get_http_session()
+        async with session.get(url, params=params) as response:
+            if response.status == 200:
+                data = await response.json()
+                return {
+                    'temperature': data['main']['temp'],
+                    'description': data['weather'][0]['description'],
+                    'humidity': data['main']['humidity'],
+                    'wind_speed': data['wind']['speed'],
+                    'country': data['sys']['country'],
+                    'city': data['name']
+                }
+            else:
+                return {"error": f"Weather API error: {response.status}"}
     except Exception as e:
         return {"error": f"Weather API request failed: {str(e)}"}
 
-async def get_amadeus_token() -> str:
-    """Get access token for Amadeus API."""
-    if not FLIGHT_API_KEY or not FLIGHT_API_SECRET:
-        return None
+class AmadeusTokenManager:
+    """
+    Caches the Amadeus OAuth token until shortly before it expires.
 
-    try:
-        url = f"{AMADEUS_BASE_URL}/v1/security/oauth2/token"
-        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-        data = {
-            'grant_type': 'client_credentials',
-            'client_id': FLIGHT_API_KEY,
-            'client_secret': FLIGHT_API_SECRET
-        }
+    Tokens are refreshed proactively in the background once they get close to expiry, and
+    concurrent refreshes on the same event loop are collapsed into a single token request.
+    """
+
+    def __init__(self, expiry_margin: float = 60, refresh_ahead: float = 300):
+        # Treat the token as expired this many seconds before Amadeus does
+        self.expiry_margin = expiry_margin
+        # Start a background refresh this many seconds before expiry
+        self.refresh_ahead = refresh_ahead
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refreshes: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task]" = weakref.WeakKeyDictionary()
+        # Whether the last token request failed at Amadeus' end (timeout, connection error or 5xx)
+        self.endpoint_failed = False
+
+    async def get_token(self) -> Optional[str]:
+        """Get a valid access token, only calling the token endpoint when needed."""
+        now = time.monotonic()
+        if self._token and now < self._expires_at - self.expiry_margin:
+            if now >= self._expires_at - self.refresh_ahead:
+                self._start_refresh()
+            return self._token
 
-        async with aiohttp.ClientSession() as session:
+        # Shield the shared refresh so a cancelled caller doesn't cancel it for everyone else
+        return await asyncio.shield(self._start_refresh())
+
+    def invalidate(self, token: Optional[str] = None):
+        """Drop the cached token (e.g. after a 401), unless it was already replaced."""
+        if token is None or token == self._token:
+            self._token = None
+            self._expires_at = 0.0
+
+    def _start_refresh(self) -> "asyncio.Task":
+        loop = asyncio.get_running_loop()
+        task = self._refreshes.get(loop)
+        if task is None or task.done():
+            task = loop.create_task(self._fetch_token())
+            self._refreshes[loop] = task
+        return task
+
+    async def _fetch_token(self) -> Optional[str]:
+        try:
+            url = f"{AMADEUS_BASE_URL}/v1/security/oauth2/token"
+            headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+            data = {
+                'grant_type': 'client_credentials',
+                'client_id': FLIGHT_API_KEY,
+                'client_secret': FLIGHT_API_SECRET
+            }
+
+            session = get_http_session()
             async with session.post(url, headers=headers, data=data) as response:
+                self.endpoint_failed = response.status >= 500
                 if response.status == 200:
                     token_data = await response.json()
-                    return token_data.get('access_token')
+                    token = token_data.get('access_token')
+                    if token:
+                        self._token = token
+                        self._expires_at = time.monotonic() + float(token_data.get('expires_in', 1799))
+                    return token
                 else:
-                    return None
-    except Exception:
+                    return self._token_if_valid()
+        except Exception:
+            self.endpoint_failed = True
+            # A failed background refresh shouldn't throw away a token that is still usable
+            return self._token_if_valid()
+
+    def _token_if_valid(self) -> Optional[str]:
+        if self._token and time.monotonic() < self._expires_at - self.expiry_margin:
+            return self._token
         return None
 
-async def search_flights_api(origin: str, destination: str, date: str) -> List[Dict[str, Any]]:
-    """Search for flights using Amadeus API."""
+
+# Shared Amadeus token cache for the whole process
+amadeus_token_manager = AmadeusTokenManager()
+
+def amadeus_auth_error() -> str:
+    """Why no token is available. Token endpoint outages read as failed requests, so they count against the circuit."""
+    if amadeus_token_manager.endpoint_failed:
+        return "Amadeus auth request failed"
+    return "Failed to authenticate with Amadeus API"
+
+async def get_amadeus_token() -> str:
+    """Get access token for Amadeus API."""
     if not FLIGHT_API_KEY or not FLIGHT_API_SECRET:
-        return [{"error": "Flight API credentials not configured"}]
+        return None
+
+    return await amadeus_token_manager.get_token()
+
+def format_flight_date(date: str) -> str:
+    """Format a MM-DD or YYYY-MM-DD date for Amadeus (YYYY-MM-DD)."""
+    import datetime
+    try:
+        if len(date.split('-')) == 2:
+            month, day = date.split('-')
+            current_year = datetime.datetime.now().year
+            return f"{current_year}-{month.zfill(2)}-{day.zfill(2)}"
+        else:
+            return date
+    except:
+        return "2025-03-05"  # Default date
 
+@cached("iata_codes")
+@guarded("flights", list_result=False)
+async def lookup_iata_code(place: str) -> Dict[str, Any]:
+    """Look up the IATA code of a city or airport with Amadeus's location search."""
     try:
-        # Get access token
         access_token = await get_amadeus_token()
         if not access_token:
-            return [{"error": "Failed to authenticate with Amadeus API"}]
+            return {"error": amadeus_auth_error()}
+
+        session = get_http_session()
+        params = {'subType': 'CITY,AIRPORT', 'keyword': place.split(",")[0].strip(), 'page[limit]': 1}
+        async with session.get(f"{AMADEUS_BASE_URL}/v1/reference-data/locations", headers={'Authorization': f'Bearer {access_token}'}, params=params) as response:
+            if response.status != 200:
+                return {"error": f"Location API error: {response.status}"}
+            locations = (await response.json()).get('data') or []
+
+        if not locations or not locations[0].get('iataCode'):
+            return {"error": f"Unknown airport or city: {place}"}
+        return {"code": locations[0]['iataCode']}
+    except Exception as e:
+        return {"error": f"Location lookup failed: {str(e)}"}
+
+async def find_iata_code(place: str) -> str:
+    """The IATA code for a place: from the bundled index, else from Amadeus, else the input as given."""
+    code = resolve_iata(place)
+    if code:
+        return code
+    # Let the flight search itself report places neither source knows
+    return (await lookup_iata_code(place)).get("code") or place
+
+@cached("flights")
+@guarded("flights")
+async def search_flights_api(origin: str, destination: str, date: str, max_offers: int = FLIGHT_MAX_OFFERS) -> List[Dict[str, Any]]:
+    """Search for flights using Amadeus API, requesting at most `max_offers` offers."""
+    if not FLIGHT_API_KEY or not FLIGHT_API_SECRET:
+        return [{"error": "Flight API credentials not configured"}]
 
+    # Amadeus only takes IATA codes, so resolve city names locally and only ask Amadeus for the rest
+    origin_code, destination_code = await asyncio.gather(find_iata_code(origin), find_iata_code(destination))
+
+    try:
         # Search for flights
         url = f"{AMADEUS_BASE_URL}/v2/shopping/flight-offers"
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json'
-        }
 
         # Format date for Amadeus (YYYY-MM-DD)
-        import datetime
-        try:
-            if len(date.split('-')) == 2:
-                month, day = date.split('-')
-                current_year = datetime.datetime.now().year
-                formatted_date = f"{current_year}-{month.zfill(2)}-{day.zfill(2)}"
-            else:
-                formatted_date = date
-        except:
-            formatted_date = "2025-03-05"  # Default date
+        formatted_date = format_flight_date(date)
 
         params = {
-            'originLocationCode': origin,
-            'destinationLocationCode': destination,
+            'originLocationCode': origin_code,
+            'destinationLocationCode': destination_code,
             'departureDate': formatted_date,
             'adults': 1,
-            'max': 5
+            'max': max_offers
         }
 
-        async with aiohttp.ClientSession() as session:
+        session = get_http_session()
+
+        # Retry once with a fresh token if the cached one was rejected
+        for attempt in range(2):
+            access_token = await get_amadeus_token()
+            if not access_token:
+                return [{"error": amadeus_auth_error()}]
+
+            headers = {
+                'Authorization': f'Bearer {access_token}',
+                'Content-Type': 'application/json'
+            }
+
             async with session.get(url, headers=headers, params=params) as response:
+                if response.status == 401 and attempt == 0:
+                    amadeus_token_manager.invalidate(access_token)
+                    continue
                 if response.status == 200:
                     data = await response.json()
                     if 'data' in data and data['data']:
-                        flights = []
-                        for offer in data['data'][:5]:
-                            itinerary = offer['itineraries'][0]
-                            segment = itinerary['segments'][0]
-                            price = offer['price']
-
-                            flights.append({
-                                'airline': segment['carrierCode'],
-                                'flight_number': f"{segment['carrierCode']}{segment['number']}",
-                                'departure_time': segment['departure']['at'],
-                                'arrival_time': segment['arrival']['at'],
-                                'origin': segment['departure']['iataCode'],
-                                'destination': segment['arrival']['iataCode'],
-                                'price': f"{price['total']} {price['currency']}",
-                                'direct': len(itinerary['segments']) == 1
-                            })
-                        return flights
+                        # Parse every offer into columns and keep a ranked shortlist, so callers rank
+                        # locally instead of searching again
+                        offers = FlightOffers.from_payload(data)
+                        return offers.records(offers.shortlist(FLIGHT_SHORTLIST))
                     else:
                         return [{"error": "No flight data available"}]
                 else:
@@ -184,108 +354,243 @@ async def search_flights_api(origin: str, destination: str, date: str) -> List[D
     except Exception as e:
         return [{"error": f"Flight API request failed: {str(e)}"}]
 
-async def search_hotels_api(city: str, check_in: str, check_out: str, adults: int = 2) -> List[Dict[str, Any]]:
-    """Search for hotels using RapidAPI Booking.com API."""
-    if not HOTEL_API_KEY:
-        return [{"error": "Hotel API key not configured"}]
+def parse_price(price: Any) -> Optional[float]:
+    """Get the amount from a price like 123.45 or "123.45 EUR"."""
+    try:
+        return float(str(price).split()[0])
+    except (ValueError, IndexError):
+        return None
+
+async def search_flight_price_calendar(origin: str, destination: str, date: str, days_around: int = 3,
+                                       max_concurrency: int = FLEX_SEARCH_CONCURRENCY) -> List[Dict[str, Any]]:
+    """
+    Search every departure date within `days_around` days of `date` and return the cheapest fare per day.
 
+    The searches run concurrently, at most `max_concurrency` at a time, and share one Amadeus token.
+    """
+    import datetime
     try:
-        # Use RapidAPI Booking.com API
-        search_url = "https://booking-com.p.rapidapi.com/v1/hotels/search"
-        headers = {
-            "X-RapidAPI-Key": HOTEL_API_KEY,
-            "X-RapidAPI-Host": "booking-com.p.rapidapi.com"
-        }
+        center = datetime.date.fromisoformat(format_flight_date(date))
+    except ValueError:
+        return [{"error": f"Invalid date: {date}"}]
 
-        # Format dates for Booking.com API (YYYY-MM-DD)
-        import datetime
-        try:
-            # Convert MM-DD to YYYY-MM-DD (assuming current year)
-            current_year = datetime.datetime.now().year
-            if len(check_in.split('-')) == 2:
-                month, day = check_in.split('-')
-                check_in = f"{current_year}-{month.zfill(2)}-{day.zfill(2)}"
-            if len(check_out.split('-')) == 2:
-                month, day = check_out.split('-')
-                check_out = f"{current_year}-{month.zfill(2)}-{day.zfill(2)}"
-        except:
-            # If date parsing fails, use default dates
-            check_in = f"{current_year}-03-05"
-            check_out = f"{current_year}-03-12"
-
-        search_params = {
-            "dest_type": "city",
-            "dest_id": "-1456928",  # Default to Sydney (will be dynamic later)
-            "search_type": "city",
-            "arrival_date": check_in,
-            "departure_date": check_out,
-            "adults": adults,
-            "room_qty": 1,
-            "page_number": 1,
-            "units": "metric",
-            "temperature_unit": "c",
-            "languagecode": "en-us",
-            "currency_code": "USD"
+    days_around = max(0, min(days_around, FLEX_SEARCH_MAX_DAYS))
+    today = datetime.date.today()
+    days = [
+        center + datetime.timedelta(days=offset)
+        for offset in range(-days_around, days_around + 1)
+        if center + datetime.timedelta(days=offset) >= today
+    ]
+    if not days:
+        return [{"error": "All dates in the window are in the past"}]
+
+    # Authenticate once up front so the concurrent searches reuse the same token
+    if FLIGHT_API_KEY and FLIGHT_API_SECRET and not await get_amadeus_token():
+        return [{"error": amadeus_auth_error()}]
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def search_day(day: datetime.date) -> Dict[str, Any]:
+        async with semaphore:
+            flights = await search_flights_api(origin, destination, day.isoformat(), max_offers=FLEX_SEARCH_MAX_OFFERS)
+
+        fares = [
+            (parse_price(flight.get('price')), flight) for flight in flights
+            if 'error' not in flight and parse_price(flight.get('price')) is not None
+        ]
+        if not fares:
+            error = next((flight['error'] for flight in flights if 'error' in flight), "No flights found")
+            return {"date": day.isoformat(), "error": error}
+
+        price, cheapest = min(fares, key=lambda fare: fare[0])
+        return {
+            "date": day.isoformat(),
+            "cheapest_price": price,
+            "currency": str(cheapest.get('price', '')).partition(' ')[2],
+            "airline": cheapest.get('airline'),
+            "flight_number": cheapest.get('flight_number'),
+            "direct": cheapest.get('direct'),
+            "options": len(fares)
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(search_url, headers=headers, params=search_params) as response:
-                if response.status == 200:
-                    hotels_data = await response.json()
-                    hotels = []
-
-                    # Parse Booking.com API response
-                    if 'result' in hotels_data:
-                        properties = hotels_data['result'][:5]  # Get first 5 hotels
-                        for prop in properties:
-                            # Extract hotel information
-                            hotel_info = {
-                                'name': prop.get('hotel_name', 'Unknown Hotel'),
-                                'price_per_night': prop.get('min_total_price', 'N/A'),
-                                'currency': prop.get('currency_code', 'USD'),
-                                'rating': prop.get('review_score', 'N/A'),
-                                'location': prop.get('district', city),
-                                'amenities': prop.get('hotel_facilities', [])[:4] if prop.get('hotel_facilities') else ['WiFi', 'Reception']
-                            }
-                            hotels.append(hotel_info)
-
-                    return hotels if hotels else [{"error": "No hotels found"}]
-                else:
-                    return [{"error": f"Hotel search API error: {response.status}"}]
+    return list(await asyncio.gather(*(search_day(day) for day in days)))
+
+def hotel_api_headers() -> Dict[str, str]:
+    return {
+        "X-RapidAPI-Key": HOTEL_API_KEY,
+        "X-RapidAPI-Host": "booking-com.p.rapidapi.com"
+    }
+
+@cached("hotel_destinations")
+@guarded("hotels", list_result=False)
+async def resolve_hotel_destination(city: str) -> Dict[str, Any]:
+    """Look up Booking.com's destination id for a city."""
+    if not HOTEL_API_KEY:
+        return {"error": "Hotel API key not configured"}
+
+    try:
+        session = get_http_session()
+        async with session.get(f"{HOTEL_BASE_URL}/v1/hotels/locations", headers=hotel_api_headers(), params={"name": city, "locale": "en-us"}) as response:
+            if response.status != 200:
+                return {"error": f"Hotel destination API error: {response.status}"}
+            locations = await response.json()
+
+        # Prefer a city match over hotels, landmarks or districts with the same name
+        locations = [location for location in locations or [] if location.get('dest_id')]
+        if not locations:
+            return {"error": f"Unknown hotel destination: {city}"}
+        location = next((location for location in locations if location.get('dest_type') == 'city'), locations[0])
+        return {"dest_id": str(location['dest_id']), "dest_type": location.get('dest_type', 'city')}
+    except Exception as e:
+        return {"error": f"Hotel destination lookup failed: {str(e)}"}
+
+@cached("hotels")
+@guarded("hotels")
+async def search_hotels_page(dest_id: str, dest_type: str, city: str, check_in: str, check_out: str, adults: int, page_number: int) -> List[Dict[str, Any]]:
+    """Fetch one page of Booking.com search results. An empty list means there are no more pages."""
+    search_params = {
+        "dest_type": dest_type,
+        "dest_id": dest_id,
+        "search_type": dest_type,
+        "arrival_date": check_in,
+        "departure_date": check_out,
+        "adults": adults,
+        "room_qty": 1,
+        "page_number": page_number,
+        "units": "metric",
+        "temperature_unit": "c",
+        "languagecode": "en-us",
+        "currency_code": "USD"
+    }
+
+    try:
+        session = get_http_session()
+        async with session.get(f"{HOTEL_BASE_URL}/v1/hotels/search", headers=hotel_api_headers(), params=search_params) as response:
+            if response.status != 200:
+                return [{"error": f"Hotel search API error: {response.status}"}]
+            hotels_data = await response.json()
     except Exception as e:
         return [{"error": f"Hotel API request failed: {str(e)}"}]
 
+    # Parse Booking.com API response
+    hotels = []
+    for prop in hotels_data.get('result') or []:
+        # Extract hotel information
+        hotels.append({
+            'hotel_id': prop.get('hotel_id'),
+            'name': prop.get('hotel_name', 'Unknown Hotel'),
+            'price_per_night': prop.get('min_total_price', 'N/A'),
+            'currency': prop.get('currency_code', 'USD'),
+            'rating': prop.get('review_score', 'N/A'),
+            'location': prop.get('district', city),
+            'amenities': prop.get('hotel_facilities', [])[:4] if prop.get('hotel_facilities') else ['WiFi', 'Reception']
+        })
+    return hotels
+
+async def iter_hotel_pages(dest_id: str, dest_type: str, city: str, check_in: str, check_out: str, adults: int = 2,
+                           max_pages: int = HOTEL_MAX_PAGES, max_concurrency: int = HOTEL_PAGE_CONCURRENCY):
+    """
+    Yield hotels from consecutive result pages, keeping up to `max_concurrency` page requests in flight.
+
+    Hotels are yielded as soon as their page arrives, and failed pages yield their error entry.
+    Stops requesting pages after the first empty one; closing the generator early cancels the
+    requests still in flight.
+    """
+    pending = set()
+    next_page = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and next_page < max_pages and len(pending) < max_concurrency:
+                pending.add(asyncio.ensure_future(
+                    search_hotels_page(dest_id, dest_type, city, check_in, check_out, adults, next_page)
+                ))
+                next_page += 1
+            if not pending:
+                return
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                hotels = task.result()
+                if not hotels or any('error' in hotel for hotel in hotels):
+                    exhausted = True
+                for hotel in hotels:
+                    yield hotel
+    finally:
+        for task in pending:
+            task.cancel()
+
+def format_hotel_dates(check_in: str, check_out: str):
+    """Format MM-DD check in and check out dates for Booking.com (YYYY-MM-DD)."""
+    import datetime
+    try:
+        # Convert MM-DD to YYYY-MM-DD (assuming current year)
+        current_year = datetime.datetime.now().year
+        if len(check_in.split('-')) == 2:
+            month, day = check_in.split('-')
+            check_in = f"{current_year}-{month.zfill(2)}-{day.zfill(2)}"
+        if len(check_out.split('-')) == 2:
+            month, day = check_out.split('-')
+            check_out = f"{current_year}-{month.zfill(2)}-{day.zfill(2)}"
+    except:
+        # If date parsing fails, use default dates
+        check_in = f"{current_year}-03-05"
+        check_out = f"{current_year}-03-12"
+    return check_in, check_out
+
+async def search_hotels_api(city: str, check_in: str, check_out: str, adults: int = 2, max_price: Optional[float] = None,
+                            amenities: Optional[List[str]] = None, wanted: int = HOTEL_CANDIDATES) -> List[Dict[str, Any]]:
+    """
+    Search for hotels using RapidAPI Booking.com API.
+
+    Pages are fetched concurrently and the search stops as soon as `wanted` hotels under `max_price`
+    that offer at least one of `amenities` have been found.
+    """
+    if not HOTEL_API_KEY:
+        return [{"error": "Hotel API key not configured"}]
+
+    destination = await resolve_hotel_destination(city)
+    if 'error' in destination:
+        return [destination]
+
+    # Format dates for Booking.com API (YYYY-MM-DD)
+    check_in, check_out = format_hotel_dates(check_in, check_out)
+
+    hotels = []
+    seen = set()
+    matches = 0
+    error = None
+    pages = iter_hotel_pages(destination['dest_id'], destination['dest_type'], city, check_in, check_out, adults)
+    try:
+        async for hotel in pages:
+            if 'error' in hotel:
+                error = error or hotel
+                continue
+
+            # Pages can overlap when results shift between requests
+            key = hotel.get('hotel_id') or hotel['name']
+            if key in seen:
+                continue
+            seen.add(key)
+
+            price = hotel.get('price_per_night')
+            if max_price is not None and not (isinstance(price, (int, float)) and price <= max_price):
+                continue
+            hotels.append(hotel)
+
+            if not amenities or any(amenity in amenities for amenity in hotel.get('amenities', [])):
+                matches += 1
+                if matches >= wanted:
+                    break
+    finally:
+        await pages.aclose()
+
+    return hotels if hotels else [error or {"error": "No hotels found"}]
+
 def get_country_suggestions() -> List[str]:
-    """Get a list of popular countries for travel."""
-    return [
-        "United States", "United Kingdom", "France", "Germany", "Italy", "Spain",
-        "Japan", "Australia", "Canada", "Brazil", "India", "China", "Thailand",
-        "Greece", "Turkey", "Egypt", "South Africa", "Mexico", "Argentina",
-        "Netherlands", "Switzerland", "Austria", "Portugal", "Norway", "Sweden",
-        "Denmark", "Belgium", "Ireland", "New Zealand", "Singapore", "Malaysia",
-        "Indonesia", "Philippines", "Vietnam", "South Korea", "Russia", "Poland",
-        "Czech Republic", "Hungary", "Croatia", "Morocco", "Israel", "UAE",
-        "Qatar", "Chile", "Peru", "Colombia", "Costa Rica", "Iceland"
-    ]
+    """Get the countries covered by the bundled airport and city index."""
+    return location_index.countries()
 
 def get_popular_cities() -> Dict[str, List[str]]:
-    """Get popular cities by country."""
-    return {
-        "United States": ["New York", "Los Angeles", "Chicago", "Miami", "Las Vegas", "San Francisco", "Boston", "Seattle"],
-        "United Kingdom": ["London", "Edinburgh", "Manchester", "Liverpool", "Bath", "Oxford", "Cambridge"],
-        "France": ["Paris", "Nice", "Lyon", "Marseille", "Bordeaux", "Strasbourg", "Toulouse"],
-        "Germany": ["Berlin", "Munich", "Hamburg", "Cologne", "Frankfurt", "Dresden", "Heidelberg"],
-        "Italy": ["Rome", "Milan", "Venice", "Florence", "Naples", "Turin", "Bologna"],
-        "Spain": ["Madrid", "Barcelona", "Seville", "Valencia", "Bilbao", "Granada", "Toledo"],
-        "Japan": ["Tokyo", "Osaka", "Kyoto", "Hiroshima", "Yokohama", "Kobe", "Nara"],
-        "Australia": ["Sydney", "Melbourne", "Brisbane", "Perth", "Adelaide", "Canberra"],
-        "Canada": ["Toronto", "Vancouver", "Montreal", "Calgary", "Ottawa", "Quebec City"],
-        "Brazil": ["Rio de Janeiro", "São Paulo", "Salvador", "Brasília", "Recife", "Fortaleza"],
-        "India": ["Mumbai", "Delhi", "Bangalore", "Chennai", "Kolkata", "Hyderabad", "Pune"],
-        "China": ["Beijing", "Shanghai", "Guangzhou", "Shenzhen", "Chengdu", "Hangzhou", "Xi'an"],
-        "Thailand": ["Bangkok", "Chiang Mai", "Phuket", "Pattaya", "Krabi", "Koh Samui"],
-        "Greece": ["Athens", "Thessaloniki", "Mykonos", "Santorini", "Rhodes", "Crete"],
-        "Turkey": ["Istanbul", "Ankara", "Antalya", "Izmir", "Cappadocia", "Bodrum"],
-        "Egypt": ["Cairo", "Alexandria", "Luxor", "Aswan", "Hurghada", "Sharm El Sheikh"],
-        "Mexico": ["Mexico City", "Cancun", "Guadalajara", "Puerto Vallarta", "Playa del Carmen", "Tulum"]
-    }
\ No newline at end of file
+    """Get popular cities by country, most popular first."""
+    return location_index.cities_by_country()